@@ -3,7 +3,7 @@
 from decimal import Decimal
 import datetime
 
-import streamlit as st
+from ui import error
 
 from common import (
     f2d,
@@ -13,7 +13,6 @@ from common import (
 )
 from Configuration import Configuration
 from Change import Change
-from common import ZERO
 
 class BaseAsset:
     asset_class = 'BaseAsset'
@@ -40,12 +39,10 @@ class BaseAsset:
         self.starting_balance = self.calculate_starting_balance(f2d(starting_balance))
         self.minimum_balance = f2d(minimum_balance)
         self.enforce_minimum_balance = enforce_minimum_balance
-        self.balance = self.starting_balance
         if priority is None:
             self.priority = self.unique_id
         else:
             self.priority = priority
-        self.unable_to_balance = False
         if interest_profile is None:
             self.interest_profile = plan.interest_profile_names[0]
         else:
@@ -90,16 +87,26 @@ class BaseAsset:
             self.enforce_minimum_balance = left.checkbox(f'{label} Enforce Minimum Balance?', value=self.enforce_minimum_balance, help='When active `Enforce Minimum Balance` will pull from other assets each month according to priority to maintain minimum')
             if self.enforce_minimum_balance:
                 self.minimum_balance = f2d(right.number_input(f'{label} Minimum Balance ($)', value=float(self.minimum_balance), step=0.01))
-        
-            
-        self.balance = self.starting_balance
 
-    def update(self, statement_date: datetime.date, period_index: int, plan) -> dict:
-        interest = plan.get_interest_profile(self.interest_profile).get_profile()[period_index]
-        update_amount = round(f2d(interest * float(self.balance)), 2)
+    def interest(self, period_index: int, plan, money, balance):
+        """ Interest on ``balance`` for the month, only credited when positive """
+        rate = plan.get_interest_profile(self.interest_profile).get_rate(period_index)
+        return money.round(rate * money.to_float(balance))
+
+    def update(self, statement_date: datetime.date, period_index: int, plan, state) -> list:
+        transactions = self.assess_interest(statement_date, period_index, plan, state)
+        if self.enforce_minimum_balance:
+            transactions.extend(self.maintain_minimum_balance(statement_date, period_index, plan, state))
+        return transactions
+
+    def assess_interest(self, statement_date: datetime.date, period_index: int, plan, state) -> list:
+        money = state.money
+        balances = state.balances
+        update_amount = self.interest(period_index, plan, money, balances[self])
         transactions = []
-        if update_amount > ZERO:
-            self.balance += update_amount
+        if update_amount > money.zero:
+            balances[self] += update_amount
+            state.refill((self,))
             transactions.append(Change(
                 'interest',
                 self.name + '_interest',
@@ -107,49 +114,58 @@ class BaseAsset:
                 statement_date,
                 self.name,
             ))
-        if self.enforce_minimum_balance and not self.unable_to_balance:
-            if self.balance < self.minimum_balance:
-                delta_needed = self.minimum_balance - self.balance
-                accounts_with_priority = [(account.name, account.priority) for account in plan.accounts if account.name != self.name]
-                accounts_with_priority.sort(key = lambda x: x[1])
-                i = 0
-                while delta_needed > ZERO:
-                    try:
-                        account_name = accounts_with_priority[i][0]
-                    except IndexError:
-                        st.error(f'Unable to maintain minimum balance on account {self.name}')
-                        self.unable_to_balance = True
-                        break
-                    account = plan.get_account(account_name)
-                    balance = account.balance
-                    if balance <= ZERO:
-                        transfer_amount = ZERO
-                    elif balance < delta_needed:
-                        transfer_amount = balance
-                    else: # plenty to transfer
-                        transfer_amount = delta_needed
-                    if transfer_amount != ZERO:
-                        delta_needed -= transfer_amount
-                        account.balance -= transfer_amount
-                        self.balance += transfer_amount
-                        transactions.extend([
-                            Change(
-                                'minimum_balance',
-                                self.name + '_min_balance',
-                                transfer_amount,
-                                statement_date,
-                                self.name,
-                            ),
-                            Change(
-                                'minimum_balance',
-                                self.name + '_min_balance',
-                                NEGATIVE_ONE * transfer_amount,
-                                statement_date,
-                                account.name
-                            )
-                        ])
-                    i += 1
-                    
+        return transactions
+
+    def maintain_minimum_balance(self, statement_date: datetime.date, period_index: int, plan, state) -> list:
+        """ Pull from other accounts by priority when below the minimum balance """
+        if self in state.unable_to_balance:
+            return []
+        money = state.money
+        balances = state.balances
+        transactions = []
+        minimum_balance = money.from_decimal(self.minimum_balance)
+        if balances[self] < minimum_balance:
+            delta_needed = minimum_balance - balances[self]
+            drained = []
+            for rank in state.funded:
+                account = state.withdrawal_order[rank]
+                if account.name == self.name:
+                    continue
+                balance = balances[account]
+                if balance <= money.zero:
+                    drained.append(rank)
+                    continue
+                elif balance < delta_needed:
+                    transfer_amount = balance
+                    drained.append(rank)
+                else: # plenty to transfer
+                    transfer_amount = delta_needed
+                delta_needed -= transfer_amount
+                balances[account] -= transfer_amount
+                balances[self] += transfer_amount
+                transactions.extend([
+                    Change(
+                        'minimum_balance',
+                        self.name + '_min_balance',
+                        transfer_amount,
+                        statement_date,
+                        self.name,
+                    ),
+                    Change(
+                        'minimum_balance',
+                        self.name + '_min_balance',
+                        -transfer_amount,
+                        statement_date,
+                        account.name
+                    )
+                ])
+                if delta_needed <= money.zero:
+                    break
+            else:
+                error(f'Unable to maintain minimum balance on account {self.name}')
+                state.unable_to_balance.add(self)
+            state.drain(drained)
+            state.refill((self,))
 
         return transactions
 
@@ -4,6 +4,7 @@ from decimal import Decimal
 import datetime
 
 class Change:
+    __slots__ = ('type', 'name', 'amount', 'date', 'account')
 
     def __init__(
         self,
@@ -0,0 +1,112 @@
+""" Streaming destinations for the transaction log
+
+A forecast run with a sink (``CompiledPlan.run(..., sink=...)`` or
+``calculate(..., sink=...)``) hands the transaction log over in chunks of
+``transactions_df`` rows as it goes instead of keeping every change until the
+end, so memory stays bounded however long the plan is (the vectorized engine
+streams a block of months at a time, but still keeps its per item and month
+cents matrices).  ``close`` finishes the output and returns what the run gives
+back in place of ``transactions_df``.
+"""
+
+from abc import ABC, abstractmethod
+import os
+
+import pandas as pd
+
+AMOUNT_SCALE = 2 # Decimal places of amounts written to Parquet
+
+class ChangeSink(ABC):
+
+    @abstractmethod
+    def write(self, frame: pd.DataFrame):
+        """ Add the next rows of ``transactions_df``, the index continues across chunks """
+
+    @abstractmethod
+    def close(self):
+        """ Finish the output, returns what the run gives back as ``transactions_df`` """
+
+    def discard(self):
+        """ Drop the output of a run that failed before ``close`` """
+
+class MemoryChangeSink(ChangeSink):
+    """ Keeps the chunks and joins them into ``transactions_df`` when closed """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, frame: pd.DataFrame):
+        self.chunks.append(frame)
+
+    def close(self) -> pd.DataFrame:
+        if len(self.chunks) < 1:
+            return pd.DataFrame()
+        # Codes are never renumbered, so the last chunk's categories extend every earlier chunk's
+        last = self.chunks[-1]
+        categorical = [column for column in last.columns if isinstance(last[column].dtype, pd.CategoricalDtype)]
+        chunks = []
+        for chunk in self.chunks:
+            chunk = chunk.copy(deep=False)
+            for column in categorical:
+                chunk[column] = chunk[column].cat.set_categories(last[column].cat.categories)
+            chunks.append(chunk)
+        self.chunks = []
+        return pd.concat(chunks)
+
+    def discard(self):
+        self.chunks = []
+
+class CsvChangeSink(ChangeSink):
+    """ Writes the same file as ``transactions_df.to_csv(path)``, returns the path """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fh = open(path, 'w', newline='')
+        self.rows = 0
+
+    def write(self, frame: pd.DataFrame):
+        frame.to_csv(self.fh, header=self.rows == 0)
+        self.rows += len(frame)
+
+    def close(self) -> str:
+        if self.rows == 0:
+            pd.DataFrame().to_csv(self.fh)
+        self.fh.close()
+        return self.path
+
+    def discard(self):
+        self.fh.close()
+        os.remove(self.path)
+
+class ParquetChangeSink(ChangeSink):
+    """ Writes each chunk as a Parquet row group, returns the path
+
+    Amounts are stored as decimals with ``amount_scale`` places, finer amounts
+    (plans with balances that are not whole cents) raise an error from pyarrow.
+    """
+
+    def __init__(self, path: str, amount_scale: int = AMOUNT_SCALE):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.path = path
+        text = pa.dictionary(pa.int32(), pa.string())
+        self.schema = pa.schema([
+            ('type', text),
+            ('name', text),
+            ('amount', pa.decimal128(38, amount_scale)),
+            ('date', pa.date32()),
+            ('account', text),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, frame: pd.DataFrame):
+        self.writer.write_table(self.pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+
+    def close(self) -> str:
+        self.writer.close()
+        return self.path
+
+    def discard(self):
+        self.writer.close()
+        os.remove(self.path)
@@ -0,0 +1,350 @@
+""" Compiled plan and per-run simulation state
+
+``CompiledPlan`` is a private snapshot of a ``Plan`` that is never modified
+while forecasting, so one compiled plan can be run any number of times, from
+several threads or shipped to other processes.  Everything that changes during
+a run (balances, minimum balance failures) lives in a ``RunState`` created
+fresh for each run.  When each transaction fires is worked out once, as a
+``schedule`` listing the transactions to apply in every month.
+
+Object engine runs through ``run_resumable`` also keep ``Checkpoints``, the
+state at the start of every month.  A later run of an edited plan starts from
+the first month the edit can affect (see ``CompiledPlan.first_changed_month``)
+instead of month 0.  Plain ``run`` calls take no snapshots.
+"""
+
+from bisect import bisect_left, insort
+import copy
+import functools
+
+import numpy as np
+
+from common import year_month_id, id_to_date, date_id, ZERO
+from Money import MONEY, MONEY_MODES, supports_cents
+from Results import BalanceLog, ChangeLog, CHUNK_ROWS
+from Plan import INDEXED_LISTS
+from vectorized import supports_vectorized, vectorized_logs
+
+ENGINES = [
+    'Auto',
+    'Object',
+    'Vectorized',
+]
+TRANSACTION_LISTS = ['incomes', 'expenses', 'transfers'] # Constant
+
+class RunState:
+
+    def __init__(self, compiled_plan, money_mode: str = MONEY_MODES[0]):
+        self.money = MONEY[money_mode]
+        self.balances = {
+            asset_item: self.money.from_decimal(asset_item.starting_balance)
+            for asset_item in compiled_plan.asset_items
+        }
+        self.unable_to_balance = set()
+        # Minimum balance withdrawals skip accounts known to be drained (balance <= 0)
+        # until something pays into them again, see refill()
+        self.withdrawal_order = compiled_plan.withdrawal_order
+        self.withdrawal_ranks = compiled_plan.withdrawal_ranks
+        self.funded = list(range(len(self.withdrawal_order)))
+        self.drained = set()
+        self.amortization = {
+            mortgage: mortgage.amortize(compiled_plan.plan, self.money, compiled_plan.month_quantity)
+            for mortgage in compiled_plan.amortized_mortgages
+        }
+
+    def drain(self, ranks: list):
+        for rank in ranks:
+            del self.funded[bisect_left(self.funded, rank)]
+            self.drained.add(self.withdrawal_order[rank])
+
+    def refill(self, accounts):
+        """ Accounts that may have been paid into, must cover every balance increase """
+        if len(self.drained) > 0:
+            for account in self.drained.intersection(accounts):
+                self.drained.remove(account)
+                insort(self.funded, self.withdrawal_ranks[account])
+
+    def snapshot(self, compiled_plan, change_rows: int) -> tuple:
+        """ State in a form that does not refer to the plan's objects """
+        asset_items = compiled_plan.asset_items
+        return (
+            tuple(self.balances[asset_item] for asset_item in asset_items),
+            frozenset(i for i, asset_item in enumerate(asset_items) if asset_item in self.unable_to_balance),
+            change_rows,
+        )
+
+    def restore(self, compiled_plan, snapshot: tuple):
+        balances, unable_to_balance, _ = snapshot
+        asset_items = compiled_plan.asset_items
+        self.balances = dict(zip(asset_items, balances))
+        self.unable_to_balance = {asset_items[i] for i in unable_to_balance}
+
+class Checkpoints:
+    """ Logs and state snapshots of one object engine run
+
+    ``snapshots[i]`` is the state at the start of month ``i`` (the last one is
+    the final state).
+    """
+
+    def __init__(self, compiled_plan, money_mode: str, balance_log: BalanceLog, change_log: ChangeLog, first_month: int = 0):
+        self.compiled_plan = compiled_plan
+        self.money_mode = money_mode
+        self.balance_log = balance_log
+        self.change_log = change_log
+        self.first_month = first_month
+        self.snapshots = []
+
+class CheckpointStore:
+    """ Checkpoints of the most recent run, to resume the next one from
+
+    Keep one store per user (e.g. per Streamlit session), a store shared by
+    several users' plans keeps resuming from the wrong plan.
+    """
+
+    def __init__(self):
+        self.checkpoints = None
+
+    def get(self) -> Checkpoints:
+        return self.checkpoints
+
+    def put(self, checkpoints: Checkpoints):
+        if checkpoints is not None:
+            self.checkpoints = checkpoints
+
+def first_difference(previous, current, limit: int) -> int:
+    """ First index below ``limit`` where two float arrays differ, ``limit`` if none """
+    limit = min(limit, len(previous), len(current))
+    differences = np.flatnonzero(np.frombuffer(previous, dtype=np.float64)[:limit] != np.frombuffer(current, dtype=np.float64)[:limit])
+    if len(differences) > 0:
+        return int(differences[0])
+    return limit
+
+class CompiledPlan:
+
+    def __init__(self, plan):
+        self.plan = copy.deepcopy(plan)
+        configuration = self.plan.configuration
+        self.start_date_id = year_month_id(configuration.start_year, configuration.start_month)
+        self.end_date_id = year_month_id(configuration.end_year, configuration.end_month)
+        self.statement_dates = tuple(id_to_date(current_date_id + 1) for current_date_id in range(self.start_date_id, self.end_date_id))
+        self.asset_items = tuple(self.plan.accounts + self.plan.assets + self.plan.liabilities)
+        self.statement_ids = tuple(date_id(statement_date) for statement_date in self.statement_dates)
+        self.transaction_items = tuple(item for attribute_name in TRANSACTION_LISTS for item in getattr(self.plan, attribute_name))
+        schedule = [[] for _ in self.statement_ids]
+        for item in self.transaction_items:
+            for period_index in item.firing_months(self.statement_ids):
+                schedule[period_index].append(item)
+        self.schedule = tuple(tuple(items) for items in schedule)
+        self.mortgages = tuple(self.plan.mortgages)
+        # A mortgage's payments are known up front unless something else changes its liability
+        active_mortgages = [mortgage for mortgage in self.mortgages if mortgage.starting_balance > ZERO]
+        liability_names = [mortgage.liability for mortgage in active_mortgages]
+        self.amortized_mortgages = tuple(
+            mortgage for mortgage in active_mortgages
+            if liability_names.count(mortgage.liability) == 1
+            and not self.plan.get_liability(mortgage.liability).enforce_minimum_balance
+        )
+        # Minimum balance withdrawals pull from accounts by priority, names resolve to the first account
+        self.withdrawal_order = tuple(dict.fromkeys(
+            self.plan.get_account(account.name)
+            for account in sorted(self.plan.accounts, key=lambda account: account.priority)
+        ))
+        self.withdrawal_ranks = {account: rank for rank, account in enumerate(self.withdrawal_order)}
+        self.rebalancing = any(asset_item.enforce_minimum_balance for asset_item in self.asset_items)
+        if self.rebalancing:
+            mortgage_accounts = frozenset(account for mortgage in self.mortgages for account in mortgage.accounts(self.plan))
+            self.paid_accounts = tuple(
+                mortgage_accounts.union(*[item.accounts(self.plan) for item in items])
+                for items in self.schedule
+            )
+        # Build everything that is otherwise built lazily so runs never write to the plan
+        for profile in self.plan.interest_profiles:
+            profile.compile()
+        for attribute_name in INDEXED_LISTS:
+            self.plan.get_name_index(attribute_name)
+        self.supports_vectorized = supports_vectorized(self.plan)
+        self.supports_cents = supports_cents(self.plan)
+
+    @property
+    def month_quantity(self) -> int:
+        return self.end_date_id - self.start_date_id
+
+    def first_changed_month(self, previous) -> int:
+        """ First month whose results can differ from the ``previous`` compiled plan
+
+        Changes to the configuration start, accounts, assets, liabilities or
+        mortgages affect every month.  A changed transaction affects months
+        from the earlier of its old and new start, and a changed interest
+        profile from the first month its rates differ.
+        """
+        first_month = min(self.month_quantity, previous.month_quantity)
+        if self.start_date_id != previous.start_date_id:
+            return 0
+        plan_dict = self.plan.to_dict()
+        previous_dict = previous.plan.to_dict()
+        for key in ['accounts', 'assets', 'liabilities', 'mortgages']:
+            if plan_dict[key] != previous_dict[key]:
+                return 0
+
+        profiles = self.plan.get_name_index('interest_profiles')
+        previous_profiles = previous.plan.get_name_index('interest_profiles')
+        if profiles.keys() != previous_profiles.keys():
+            return 0
+        for name, profile in profiles.items():
+            previous_profile = previous_profiles[name]
+            for attribute_name in ['rates', 'growth', 'factors']:
+                first_month = first_difference(getattr(previous_profile, attribute_name), getattr(profile, attribute_name), first_month)
+
+        # Milestones only matter through the start/end dates they give transactions
+        for attribute_name in TRANSACTION_LISTS:
+            items = getattr(self.plan, attribute_name)
+            previous_items = getattr(previous.plan, attribute_name)
+            for i in range(max(len(items), len(previous_items))):
+                item = items[i] if i < len(items) else None
+                previous_item = previous_items[i] if i < len(previous_items) else None
+                if item is not None and previous_item is not None:
+                    if (item.to_dict(), item.start, item.end) == (previous_item.to_dict(), previous_item.start, previous_item.end):
+                        continue
+                for changed_item, compiled_plan in [(item, self), (previous_item, previous)]:
+                    if changed_item is not None:
+                        first_month = min(first_month, changed_item.active_months(compiled_plan.statement_ids).start)
+        return first_month
+
+    def run(
+        self,
+        engine: str = ENGINES[0],
+        money_mode: str = MONEY_MODES[0],
+        progress = None,
+        instrumentation = None,
+        sink = None,
+        chunk_rows: int = CHUNK_ROWS) -> tuple:
+        """ Forecast the plan, returns (balance_log, transactions_df)
+
+        :param progress: optional wrapper around the month iterator of the
+            object engine, e.g. a progress bar
+        :param instrumentation: optional ``Instrumentation.Instrumentation``
+            to record where the time goes
+        :param sink: optional ``ChangeSinks.ChangeSink`` that receives the
+            transaction log every ``chunk_rows`` rows, whatever its ``close``
+            returns is given back in place of ``transactions_df``
+        """
+        return self.run_resumable(engine, money_mode, progress, instrumentation=instrumentation, sink=sink, chunk_rows=chunk_rows, keep_checkpoints=False)[0]
+
+    def run_resumable(
+        self,
+        engine: str = ENGINES[0],
+        money_mode: str = MONEY_MODES[0],
+        progress = None,
+        previous: Checkpoints = None,
+        instrumentation = None,
+        sink = None,
+        chunk_rows: int = CHUNK_ROWS,
+        keep_checkpoints: bool = True) -> tuple:
+        """ Forecast the plan, returns ((balance_log, transactions_df), checkpoints)
+
+        :param previous: checkpoints of an earlier run, possibly of a
+            different plan, to resume from where the plans start to differ
+        :param sink: see ``run``, streamed runs neither resume nor keep checkpoints
+        :param keep_checkpoints: False skips the monthly state snapshots
+        :return: checkpoints are None for the vectorized engine and when
+            they are not kept
+        """
+        if engine != ENGINES[1] and self.supports_vectorized:
+            if instrumentation is not None:
+                start = instrumentation.clock()
+            balance_log, change_log = vectorized_logs(self.plan, sink, chunk_rows)
+            if instrumentation is not None:
+                instrumentation.record('vectorized', None, instrumentation.clock() - start, change_log.first_row + len(change_log))
+                instrumentation.months += self.month_quantity
+                start = instrumentation.clock()
+            if sink is None:
+                results = (balance_log.to_frame(), change_log.to_frame())
+            else:
+                results = (balance_log.to_frame(), sink.close())
+            if instrumentation is not None:
+                instrumentation.record('dataframes', None, instrumentation.clock() - start)
+            return results, None
+        if instrumentation is not None:
+            start = instrumentation.clock()
+        if not self.supports_cents:
+            money_mode = MONEY_MODES[0]
+        state = RunState(self, money_mode)
+        balance_log = BalanceLog(self.asset_items, self.statement_dates)
+        change_log = ChangeLog(self.statement_dates)
+        first_month = 0
+        if previous is not None and previous.money_mode == money_mode and sink is None:
+            first_month = self.first_changed_month(previous.compiled_plan)
+        checkpoints = None
+        if keep_checkpoints and sink is None:
+            checkpoints = Checkpoints(self, money_mode, balance_log, change_log, first_month)
+        if first_month > 0:
+            snapshot = previous.snapshots[first_month]
+            state.restore(self, snapshot)
+            balance_log.copy_months(previous.balance_log, first_month)
+            change_log.copy_rows(previous.change_log, snapshot[2])
+            if checkpoints is not None:
+                checkpoints.snapshots.extend(previous.snapshots[:first_month])
+        months = range(first_month, self.month_quantity)
+        if progress is not None:
+            months = progress(months)
+        if instrumentation is None:
+            run_month = self.run_month
+        else:
+            instrumentation.record('setup', None, instrumentation.clock() - start)
+            instrumentation.months += len(months)
+            run_month = functools.partial(self.run_month_instrumented, instrumentation=instrumentation)
+        for period_index in months:
+            if checkpoints is not None:
+                checkpoints.snapshots.append(state.snapshot(self, len(change_log)))
+            elif sink is not None and len(change_log) >= chunk_rows:
+                change_log.flush(sink)
+            run_month(period_index, state, balance_log, change_log)
+        if checkpoints is not None:
+            checkpoints.snapshots.append(state.snapshot(self, len(change_log)))
+        if instrumentation is not None:
+            start = instrumentation.clock()
+        if sink is None:
+            results = (balance_log.to_frame(), change_log.to_frame())
+        else:
+            change_log.flush(sink)
+            results = (balance_log.to_frame(), sink.close())
+        if instrumentation is not None:
+            instrumentation.record('dataframes', None, instrumentation.clock() - start)
+        return results, checkpoints
+
+    def run_month(self, period_index: int, state: RunState, balance_log: BalanceLog, change_log: ChangeLog):
+        statement_date = self.statement_dates[period_index] # Show balance as the first of the following month
+        for asset_item in self.asset_items:
+            change_log.extend(period_index, asset_item.update(statement_date, period_index, self.plan, state))
+        for item in self.schedule[period_index]:
+            change_log.extend(period_index, item.update(statement_date, period_index, self.plan, state))
+        for mortgage in self.mortgages:
+            change_log.extend(period_index, mortgage.update(statement_date, period_index, self.plan, state))
+        if self.rebalancing:
+            state.refill(self.paid_accounts[period_index])
+        balance_log.record(period_index, [state.balances[asset_item] for asset_item in self.asset_items])
+
+    def run_month_instrumented(self, period_index: int, state: RunState, balance_log: BalanceLog, change_log: ChangeLog, instrumentation):
+        """ ``run_month`` with every step timed """
+        clock = instrumentation.clock
+        record = instrumentation.record
+        statement_date = self.statement_dates[period_index]
+        updates = []
+        for asset_item in self.asset_items:
+            updates.append(('interest', asset_item, asset_item.assess_interest))
+            if asset_item.enforce_minimum_balance:
+                updates.append(('minimum_balance', asset_item, asset_item.maintain_minimum_balance))
+        updates.extend(('transactions', item, item.update) for item in self.schedule[period_index])
+        updates.extend(('mortgages', mortgage, mortgage.update) for mortgage in self.mortgages)
+        for phase, item, update in updates:
+            start = clock()
+            changes = update(statement_date, period_index, self.plan, state)
+            record(phase, type(item).__name__, clock() - start, len(changes))
+            start = clock()
+            change_log.extend(period_index, changes)
+            record('change_log', None, clock() - start)
+        start = clock()
+        if self.rebalancing:
+            state.refill(self.paid_accounts[period_index])
+        balance_log.record(period_index, [state.balances[asset_item] for asset_item in self.asset_items])
+        record('balance_log', None, clock() - start)
@@ -2,7 +2,7 @@
 
 import datetime
 
-import streamlit as st
+from ui import st
 
 from common import get_month
 
@@ -0,0 +1,67 @@
+""" Forecast instrumentation
+
+An ``Instrumentation`` passed to ``calculate`` (or ``CompiledPlan.run``)
+collects the wall time, call count and number of ``Change`` objects of a
+forecast, both by phase (interest, minimum balance, transactions, mortgages,
+result logging, DataFrame building, ...) and by item class (Account, Income,
+Mortgage, ...).  Nothing is timed when no instrumentation is given.
+"""
+
+import time
+
+PHASES = [
+    'setup',
+    'interest',
+    'minimum_balance',
+    'transactions',
+    'mortgages',
+    'change_log',
+    'balance_log',
+    'dataframes',
+    'vectorized',
+] # Constant
+
+class Instrumentation:
+
+    def __init__(self):
+        self.clock = time.perf_counter
+        self.phases = {}
+        self.classes = {}
+        self.months = 0
+
+    def record(self, phase: str, item_class: str, seconds: float, changes: int = 0, calls: int = 1):
+        """ Add one timed call, ``item_class`` is None for work not done by a plan item """
+        for totals_by_key, key in [(self.phases, phase), (self.classes, item_class)]:
+            if key is None:
+                continue
+            totals = totals_by_key.get(key, None)
+            if totals is None:
+                totals = [0.0, 0, 0]
+                totals_by_key[key] = totals
+            totals[0] += seconds
+            totals[1] += calls
+            totals[2] += changes
+
+    def clear(self):
+        self.phases = {}
+        self.classes = {}
+        self.months = 0
+
+    @staticmethod
+    def table(totals_by_key: dict, order: list = None) -> dict:
+        keys = sorted(totals_by_key.keys(), key=lambda key: order.index(key) if order is not None and key in order else len(PHASES))
+        return {
+            key: {'seconds': totals_by_key[key][0], 'calls': totals_by_key[key][1], 'changes': totals_by_key[key][2]}
+            for key in keys
+        }
+
+    def report(self) -> dict:
+        """ Totals by phase and by item class, e.g. ``report()['phases']['interest']['seconds']`` """
+        return {
+            'months': self.months,
+            'seconds': sum(totals[0] for totals in self.phases.values()),
+            # Vectorized runs are not broken down by class, so count by phase
+            'changes': sum(totals[2] for phase, totals in self.phases.items() if phase != 'change_log'),
+            'phases': self.table(self.phases, PHASES),
+            'classes': self.table(self.classes),
+        }
@@ -1,24 +1,33 @@
 """ InterestProfile class """
 
+from array import array
 import datetime
 from decimal import Decimal
+import math
 
-import streamlit as st
+import numpy as np
+
+from ui import st
 
 from common import date_id, f2d, future_value
 
 PROFILE_TYPES = [
     'Constant',
     'Linear',
+    'Stochastic',
     #'Complex / Piece Wise',
 ]
 
 PHASE_TYPES = [
     'Constant',
     'Linear',
+    'Normal',
+    'Lognormal',
 ]
+STOCHASTIC_PHASE_TYPES = PHASE_TYPES[2:]
 
 DEFAULT_RATE = 2.0
+DEFAULT_VOLATILITY = 15.0
 
 def yearly_percentage_to_monthly(rate: float) -> float:
     return rate / 100.0 / 12.0
@@ -56,6 +65,14 @@ class InterestPhase:
     def get_profile(self) -> list:
         return []
 
+    def sample(self, start: datetime.date, end: datetime.date, path_quantity: int, generator) -> np.ndarray:
+        """ Monthly rates for ``path_quantity`` Monte Carlo paths (paths x months) """
+        return np.tile(np.array(self.get_profile(start, end), dtype=np.float64), (path_quantity, 1))
+
+    @property
+    def seed(self):
+        return None
+
     def configure(self):
         pass
 
@@ -97,6 +114,7 @@ class LinearPhase(InterestPhase):
     def update_dict(self, data: dict) -> dict:
         data['start_rate'] = self.start_rate
         data['end_rate'] = self.end_rate
+        return data
 
     @property
     def _start_rate(self) -> float:
@@ -114,6 +132,8 @@ class LinearPhase(InterestPhase):
     def get_profile(self, start: datetime.date, end: datetime.date) -> list:
         start = date_id(start)
         end = date_id(end)
+        if end <= start: # zero month forecast
+            return []
 
         increment = (self._end_rate - self._start_rate) / (end - start)
 
@@ -124,10 +144,61 @@ class LinearPhase(InterestPhase):
             current += 1
         return profile
 
+class StochasticPhase(ConstantPhase):
+    """ Random monthly returns around ``rate`` for Monte Carlo forecasts
+
+    Deterministic forecasts use the mean ``rate`` like a ``ConstantPhase``.
+    ``Normal`` draws the monthly rate directly, ``Lognormal`` draws the monthly
+    growth factor with the same mean.  ``volatility`` is the yearly standard
+    deviation (%).
+    """
+    base_label = 'Stochastic'
+
+    def __init__(
+        self,
+        *args,
+        volatility: float = DEFAULT_VOLATILITY,
+        seed: int = None,
+        **kwargs):
+
+        super().__init__(*args, **kwargs)
+        self.volatility = volatility
+        self._seed = seed
+
+    def update_dict(self, data: dict) -> dict:
+        data['volatility'] = self.volatility
+        if self._seed is not None:
+            data['seed'] = self._seed
+        return data
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def monthly_volatility(self) -> float:
+        return self.volatility / 100.0 / math.sqrt(12.0)
+
+    def configure(self, location):
+        left, middle, right = location.columns(3)
+        self.phase_type = left.selectbox(f'{self.label} Distribution', options=STOCHASTIC_PHASE_TYPES, index=STOCHASTIC_PHASE_TYPES.index(self.phase_type))
+        self.rate = middle.number_input(f'{self.label} Mean Rate (%/year)', value=self.rate, step=0.01)
+        self.volatility = right.number_input(f'{self.label} Volatility (%/year)', value=self.volatility, min_value=0.0, step=0.01)
+
+    def sample(self, start: datetime.date, end: datetime.date, path_quantity: int, generator) -> np.ndarray:
+        shape = (path_quantity, date_id(end) - date_id(start))
+        if self.phase_type == PHASE_TYPES[3]: # Lognormal
+            sigma = self.monthly_volatility
+            mu = math.log(1.0 + self.monthly_rate) - sigma * sigma / 2.0
+            return np.exp(generator.normal(mu, sigma, size=shape)) - 1.0
+        return generator.normal(self.monthly_rate, self.monthly_volatility, size=shape)
+
 PHASE_MAP = {
     PHASE_TYPES[0]: ConstantPhase,
-    PHASE_TYPES[1]: LinearPhase
-}      
+    PHASE_TYPES[1]: LinearPhase,
+    PHASE_TYPES[2]: StochasticPhase,
+    PHASE_TYPES[3]: StochasticPhase,
+}
 
 class InterestProfile:
     description = """ `Interest Profiles` allow the application of different rates of appreciation
@@ -141,6 +212,9 @@ Some `Liabilities` such as mortgages and loans do not increase over time and the
 
 `Accounts` that are invested can use a different (and hopefully higher) appreciation rate `Interest Profile`.
 
+`Stochastic` `Interest Profiles` draw random monthly rates (`Normal` or `Lognormal`) around the mean rate with the
+given volatility for the `Monte Carlo View`.  The regular forecast uses the mean rate.
+
 ** It is recommended (but not required) that you do not remove or rename the "Inflation" and "No Interest" `Interest Profiles`.
 Do feel free to change the "Inflation" rate if you disagree with the default.**
 
@@ -162,8 +236,9 @@ Do feel free to change the "Inflation" rate if you disagree with the default.**
         else:
             self.name = name
         self.profile_type = profile_type
-        self.interest_phases = self.initialize_phases(profile_phases)        
-        
+        self.interest_phases = self.initialize_phases(profile_phases)
+        self.invalidate()
+
 
     @property
     def start(self) -> datetime.date:
@@ -194,11 +269,83 @@ Do feel free to change the "Inflation" rate if you disagree with the default.**
         }
 
     def get_profile(self) -> list:
+        return list(self.rates)
+
+    def build_profile(self) -> list:
         profile = []
         for phase in self.interest_phases:
             profile.extend(phase.get_profile(self.start, self.end))
         return profile
 
+    def invalidate(self):
+        self._rates = None
+        self._growth = None
+        self._factors = None
+        self._compiled_key = None
+
+    @property
+    def compiled_key(self) -> tuple:
+        return (
+            self.configuration.start_year,
+            self.configuration.start_month,
+            self.configuration.duration,
+        )
+
+    def compile(self):
+        """ Build the monthly rate vector and cumulative growth table
+
+        ``growth[n]`` is the growth factor accumulated over the first ``n``
+        periods, so ``growth[0]`` is always 1.0 and the table is one longer
+        than the rate vector.  ``factors`` holds the multiplier used by
+        calculate_future_value for each period.
+        """
+        rates = array('d', self.build_profile())
+        growth = array('d', [1.0])
+        current = 1.0
+        for rate in rates:
+            current = current * (1.0 + rate)
+            growth.append(current)
+        if self.profile_type == PROFILE_TYPES[0]: # Constant
+            rate = self.interest_phases[0].monthly_rate
+            factors = array('d', [math.pow(1 + rate, i) for i in range(len(growth))])
+        else:
+            factors = growth
+        self._rates = rates
+        self._growth = growth
+        self._factors = factors
+        self._compiled_key = self.compiled_key
+
+    @property
+    def rates(self) -> array:
+        if self._rates is None or self._compiled_key != self.compiled_key:
+            self.compile()
+        return self._rates
+
+    @property
+    def growth(self) -> array:
+        if self._growth is None or self._compiled_key != self.compiled_key:
+            self.compile()
+        return self._growth
+
+    def get_rate(self, period_index: int) -> float:
+        return self.rates[period_index]
+
+    def get_growth(self, period_index: int) -> float:
+        return self.growth[period_index]
+
+    @property
+    def factors(self) -> array:
+        if self._factors is None or self._compiled_key != self.compiled_key:
+            self.compile()
+        return self._factors
+
+    def get_future_value_factors(self) -> array:
+        """ Factor applied to a value by calculate_future_value for each period """
+        return self.factors
+
+    def get_future_value_factor(self, period_index: int) -> float:
+        return self.factors[period_index]
+
     def configure(self, location):
         location.markdown('---')
         left, right = location.columns(2)
@@ -239,18 +386,57 @@ Do feel free to change the "Inflation" rate if you disagree with the default.**
                 )
                 phase.configure(location)
                 self.interest_phases = [phase]
+        elif self.profile_type == PROFILE_TYPES[2]: # Stochastic
+            create_default = False
+            if self.interest_phases is not None:
+                first_phase = self.interest_phases[0]
+                if first_phase.phase_type not in STOCHASTIC_PHASE_TYPES or len(self.interest_phases) > 1: # bad
+                    create_default = True
+                else: # good
+                    first_phase.configure(location)
+            else:
+                create_default = True
+            if create_default:
+                phase = StochasticPhase(
+                    1,
+                    self.label,
+                    phase_type=PHASE_TYPES[2],
+                )
+                phase.configure(location)
+                self.interest_phases = [phase]
         # elif Piecewise
             # handle the dates here, not in phases
+        self.invalidate()
+
+    @property
+    def stochastic(self) -> bool:
+        return any(phase.phase_type in STOCHASTIC_PHASE_TYPES for phase in self.interest_phases)
+
+    def sample_rates(self, path_quantity: int, seed: int, chunk_index: int = 0) -> np.ndarray:
+        """ Monthly rates for a batch of Monte Carlo paths (paths x months)
+
+        Each phase draws from its own stream, seeded by the phase ``seed`` when
+        set and the Monte Carlo ``seed`` otherwise, so a given chunk of paths
+        is reproducible no matter which process computes it.
+        """
+        samples = []
+        for phase in self.interest_phases:
+            entropy = seed if phase.seed is None else phase.seed
+            generator = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(self.unique_id, phase.unique_id, chunk_index)))
+            samples.append(phase.sample(self.start, self.end, path_quantity, generator))
+        return np.hstack(samples)
+
+    def sample_factors(self, path_quantity: int, seed: int, chunk_index: int = 0) -> np.ndarray:
+        """ calculate_future_value factors per path (paths x months + 1) """
+        if not self.stochastic:
+            factors = np.frombuffer(self.factors, dtype=np.float64)
+            return np.broadcast_to(factors, (path_quantity, len(factors)))
+        growth = np.cumprod(1.0 + self.sample_rates(path_quantity, seed, chunk_index), axis=1)
+        return np.hstack([np.ones((path_quantity, 1)), growth])
 
     def calculate_future_value(self, value: Decimal, period_index: int) -> Decimal:
         if self.profile_type == PROFILE_TYPES[0]: # Constant:
             result = round(future_value(value, self.interest_phases[0].monthly_rate, period_index), 2)
         else:
-            counter = 0
-            profile = self.get_profile()
-            current_value = float(value)
-            while counter < period_index:
-                current_value = current_value * (1.0 + profile[counter])
-                counter += 1
-            result = round(f2d(current_value), 2)
+            result = round(f2d(float(value) * self.get_growth(period_index)), 2)
         return result
@@ -2,7 +2,7 @@
 
 import datetime
 
-import streamlit as st
+from ui import st
 
 class Milestone:
     description = """`Milestones` are simply named dates that can be used later in the definition of `Income`, `Expenses` and `Transfers`.
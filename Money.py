@@ -0,0 +1,78 @@
+""" Money representations for the forecast
+
+The object engine does all balance arithmetic through one of these so the
+same ``update()`` code can run on ``Decimal`` amounts or on integer cents.
+Both apply the same rounding (``round(f2d(value), 2)``), cents only convert
+back to ``Decimal`` at the output boundary.
+"""
+
+from decimal import Decimal
+
+from common import f2d, f2c
+
+MONEY_MODES = [
+    'Decimal',
+    'Cents',
+]
+
+class DecimalMoney:
+    mode = MONEY_MODES[0]
+    zero = Decimal('0.00')
+    smallest = Decimal('0.01')
+
+    def from_decimal(self, value: Decimal) -> Decimal:
+        return value
+
+    def to_decimal(self, value: Decimal) -> Decimal:
+        return value
+
+    def to_float(self, value: Decimal) -> float:
+        return float(value)
+
+    def round(self, value: float) -> Decimal:
+        return round(f2d(value), 2)
+
+    def future_value(self, profile, value: Decimal, period_index: int) -> Decimal:
+        return profile.calculate_future_value(value, period_index)
+
+class CentsMoney:
+    mode = MONEY_MODES[1]
+    zero = 0
+    smallest = 1
+
+    def from_decimal(self, value: Decimal) -> int:
+        cents = value.scaleb(2)
+        if cents != int(cents):
+            raise ValueError(f'{value} is not a whole number of cents')
+        return int(cents)
+
+    def to_decimal(self, value: int) -> Decimal:
+        return Decimal(value).scaleb(-2)
+
+    def to_float(self, value: int) -> float:
+        return value / 100.0
+
+    def round(self, value: float) -> int:
+        return f2c(value)
+
+    def future_value(self, profile, value: Decimal, period_index: int) -> int:
+        return f2c(float(value) * profile.get_future_value_factor(period_index))
+
+MONEY = {
+    MONEY_MODES[0]: DecimalMoney(),
+    MONEY_MODES[1]: CentsMoney(),
+}
+DECIMAL_MONEY = MONEY[MONEY_MODES[0]]
+
+def is_whole_cents(value: Decimal) -> bool:
+    return value == round(value, 2)
+
+def supports_cents(plan) -> bool:
+    for asset_list in [plan.accounts, plan.assets, plan.liabilities]:
+        for asset_item in asset_list:
+            if not is_whole_cents(asset_item.starting_balance) or not is_whole_cents(asset_item.minimum_balance):
+                return False
+    for mortgage in plan.mortgages:
+        if not is_whole_cents(mortgage.payment):
+            return False
+    return True
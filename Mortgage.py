@@ -3,9 +3,9 @@
 from decimal import Decimal
 import datetime
 
-import streamlit as st
+from ui import st
 
-from common import f2d, mortgage_payment, ZERO, NEGATIVE_ONE
+from common import f2d, mortgage_payment, ZERO
 from Change import Change
 
 class Mortgage:
@@ -103,31 +103,67 @@ be made."""
             self.extra_principal = f2d(location.number_input(f'{label} Extra Principal ($/month)', value=float(self.extra_principal), min_value=0.0, step=0.01))
             location.markdown(f'Payment $ {self.payment}')
 
-    def update(self, date: datetime.date, period_index: int, plan) -> list:
+    def accounts(self, plan) -> tuple:
+        """ Accounts whose balance the mortgage payments change """
+        if self.starting_balance > ZERO:
+            return (plan.get_account(self.source_account),)
+        return ()
+
+    def next_payment(self, money, liability_balance, payment) -> tuple:
+        """ (interest, principal, total, close) paid against the remaining balance, None once paid off """
+        abs_remaining_balance = abs(liability_balance)
+        if abs_remaining_balance <= money.smallest:
+            return None
+        if payment < abs_remaining_balance:
+            interest_payment = money.round(money.to_float(abs_remaining_balance) * self.rate)
+            return interest_payment, payment - interest_payment, payment, False
+        return money.zero, abs_remaining_balance, abs_remaining_balance, True
+
+    def amortize(self, plan, money, month_quantity: int) -> tuple:
+        """ Payment (see ``next_payment``) for every month of the forecast
+
+        Only valid when nothing else changes the liability balance: it is
+        replayed from the liability's starting balance and interest.
+        """
+        liability = plan.get_liability(self.liability)
+        liability_rates = plan.get_interest_profile(liability.interest_profile).rates
+        liability_balance = money.from_decimal(liability.starting_balance)
+        payment = money.from_decimal(self.payment)
+        schedule = [None] * month_quantity
+        for period_index in range(month_quantity):
+            if liability_rates[period_index] != 0.0:
+                interest = liability.interest(period_index, plan, money, liability_balance)
+                if interest > money.zero:
+                    liability_balance += interest
+            month_payment = self.next_payment(money, liability_balance, payment)
+            schedule[period_index] = month_payment
+            if month_payment is not None:
+                if month_payment[3]: # close, no interest on a zero balance so nothing more to pay
+                    break
+                liability_balance += month_payment[1]
+        return tuple(schedule)
+
+    def update(self, date: datetime.date, period_index: int, plan, state) -> list:
+        money = state.money
+        balances = state.balances
         changes = []
         if self.starting_balance > ZERO: # Not worth doing anything if not configured            
             liability = plan.get_liability(self.liability)
-            abs_remaining_balance = abs(liability.balance)
-            if abs_remaining_balance > Decimal('0.01'):                
+            schedule = state.amortization.get(self, None)
+            if schedule is not None:
+                month_payment = schedule[period_index]
+            else: # Something else changes the liability, go month by month
+                month_payment = self.next_payment(money, balances[liability], money.from_decimal(self.payment))
+            if month_payment is not None:
+                interest_payment, principal_payment, total_payment, close = month_payment
                 source = plan.get_account(self.source_account)
-                if self.payment < abs_remaining_balance:
-                    interest_payment = round(f2d(float(abs_remaining_balance) * self.rate), 2)
-                    principal_payment = self.payment - interest_payment
-                    total_payment = self.payment
-                    close = False
-                else:
-                    principal_payment = abs_remaining_balance
-                    interest_payment = ZERO
-                    total_payment = abs_remaining_balance
-                    close = True
+                balances[source] -= total_payment
                 
-                source.balance -= total_payment
-                
-                if interest_payment != ZERO:
+                if interest_payment != money.zero:
                     changes.append(Change(
                         'mortgage_interest',
                         self.name,
-                        NEGATIVE_ONE * interest_payment,
+                        -interest_payment,
                         date,
                         source.name
                     ))
@@ -135,7 +171,7 @@ be made."""
                     Change(
                         'mortgage_equity',
                         self.name,
-                        NEGATIVE_ONE * principal_payment,
+                        -principal_payment,
                         date,
                         source.name,
                     ),
@@ -147,12 +183,7 @@ be made."""
                         liability.name,
                     )
                 ])
-                liability.balance += principal_payment
+                balances[liability] += principal_payment
                 if close:
-                    liability.balance = ZERO
+                    balances[liability] = money.zero
         return changes
-                
-                
-
-
-    
\ No newline at end of file
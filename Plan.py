@@ -1,7 +1,6 @@
 """ Plan Object """
 
-import streamlit as st
-import pandas as pd
+from ui import st, error, warning
 
 from Configuration import Configuration
 from Assets import Asset, Account, Liability
@@ -14,9 +13,18 @@ PLAN_MAJOR = 0
 PLAN_MINOR = 1
 PLAN_VERSION = f'{PLAN_MAJOR}.{PLAN_MINOR}'
 
+# Lists that support lookup by name, mapped to the label used in errors
+INDEXED_LISTS = {
+    'accounts': 'Account',
+    'liabilities': 'Liability',
+    'interest_profiles': 'Interest Profile',
+    'milestones': 'Milestone',
+}
+
 class Plan:
 
     def __init__(self, saved_plan: dict, check_version: bool = True):
+        self._name_indices = {}
         # Only check version on populated plans
         if len(saved_plan) > 0 and check_version:
             self.verify_version(saved_plan.get('version', None))
@@ -74,18 +82,53 @@ class Plan:
             'mortgages': [mortgage.to_dict() for mortgage in self.mortgages],
         }
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in INDEXED_LISTS:
+            self._name_indices.pop(name, None)
+
+    def get_name_index(self, attribute_name: str) -> dict:
+        """ Name to object mapping for one of the indexed lists
+
+        Rebuilt lazily after the list is replaced (e.g. by configure()) or its
+        names change, including items renamed in place.  The first item wins
+        for duplicate names, matching the previous list.index() behavior.
+        """
+        items = getattr(self, attribute_name)
+        names = [item.name for item in items]
+        cached = self._name_indices.get(attribute_name, None)
+        if cached is None or cached[0] != names:
+            index = {}
+            for item in items:
+                index.setdefault(item.name, item)
+            cached = (names, index)
+            self._name_indices[attribute_name] = cached
+        return cached[1]
+
+    def get_by_name(self, attribute_name: str, name: str):
+        # A hit whose name still matches needs no check of the whole list
+        cached = self._name_indices.get(attribute_name, None)
+        if cached is not None and len(cached[0]) == len(getattr(self, attribute_name)):
+            item = cached[1].get(name, None)
+            if item is not None and item.name == name:
+                return item
+        try:
+            return self.get_name_index(attribute_name)[name]
+        except KeyError:
+            raise ValueError(f'Unknown {INDEXED_LISTS[attribute_name]} "{name}"') from None
+
     def verify_version(self, version: str):
         if version is None:
-            st.error('Configuration file does not contain version!  Errors may occur.  Consider restarting plan and re-saving.')
+            error('Configuration file does not contain version!  Errors may occur.  Consider restarting plan and re-saving.')
         else:
             try:
                 major, minor = version.split('.')
                 if int(major) != PLAN_MAJOR:
-                    st.error(f'Configuration file version {version} does not match the latest version {PLAN_VERSION}.  Errors may occur.  Consider restarting plan and re-saving.')
+                    error(f'Configuration file version {version} does not match the latest version {PLAN_VERSION}.  Errors may occur.  Consider restarting plan and re-saving.')
                 elif int(minor) != PLAN_MINOR:
-                    st.warning(f'Configuration file version {version} appears to be a little old (latest is {PLAN_VERSION}).  Recommend re-saving the file.')
+                    warning(f'Configuration file version {version} appears to be a little old (latest is {PLAN_VERSION}).  Recommend re-saving the file.')
             except ValueError:
-                st.error(f'Configuration file version {version} does not have the proper format, e.g. X.Y! Errors may occur.  Consider restarting plan and re-saving.')
+                error(f'Configuration file version {version} does not have the proper format, e.g. X.Y! Errors may occur.  Consider restarting plan and re-saving.')
 
     @property
     def account_names(self) -> list:
@@ -104,7 +147,8 @@ class Plan:
         return [milestone.name for milestone in self.milestones]
 
     @property
-    def table_summary(self) -> pd.DataFrame:
+    def table_summary(self):
+        import pandas as pd
         data = [len(getattr(self, attribute_name)) for _, attribute_name in self.all_lists]
         index = [name for name, _ in self.all_lists]
         frame = pd.DataFrame(data, index=index)
@@ -124,16 +168,16 @@ class Plan:
         return Builder(i, self.configuration)
 
     def get_account(self, account_name: str) -> Account:
-        return self.accounts[self.account_names.index(account_name)]
+        return self.get_by_name('accounts', account_name)
 
     def get_liability(self, liability_name: str) -> Liability:
-        return self.liabilities[self.liability_names.index(liability_name)]
+        return self.get_by_name('liabilities', liability_name)
 
     def get_interest_profile(self, profile_name: str) -> InterestProfile:
-        return self.interest_profiles[self.interest_profile_names.index(profile_name)]
+        return self.get_by_name('interest_profiles', profile_name)
 
     def get_milestone(self, milestone_name: str) -> Milestone:
-        return self.milestones[self.milestone_names.index(milestone_name)]
+        return self.get_by_name('milestones', milestone_name)
 
     def configure(self):
         with st.expander('Plan Configuration'):
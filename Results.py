@@ -0,0 +1,321 @@
+""" Forecast result collectors
+
+``BalanceLog`` and ``ChangeLog`` write results into typed columns (month
+index, interned string codes and integer cents) while a forecast runs and
+only build the ``balance_log`` / ``transactions_df`` DataFrames at the end.
+Amounts that are not a whole number of cents are kept exactly as Decimal
+overrides so no precision is lost.
+"""
+
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from Change import Change
+
+INITIAL_CAPACITY = 1024
+CHUNK_ROWS = 65536 # Rows handed to a ChangeSinks sink at a time
+ROLLUP_KEYS = ['type', 'name', 'account', 'date']
+
+def decimal_to_cents(value: Decimal) -> tuple:
+    """ Split a Decimal into integer cents and an override for sub-cent values
+
+    Values that are already integer cents (``Money.CentsMoney``) pass through.
+    """
+    if type(value) is int:
+        return value, None
+    scaled = value.scaleb(2)
+    cents = int(scaled)
+    if cents != scaled:
+        return cents, value
+    return cents, None
+
+def cents_to_decimal(cents: int) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
+
+def cents_to_decimals(cents: np.ndarray) -> np.ndarray:
+    """ Object array of Decimals sharing one (immutable) Decimal per distinct amount """
+    values, inverse = np.unique(cents, return_inverse=True)
+    return np.array([cents_to_decimal(value) for value in values], dtype=object)[inverse]
+
+def read_only_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """ Copy of ``frame`` whose column arrays reject in-place writes
+
+    For frames shared between users (e.g. cached results), ``frame.loc[...] =``
+    and similar raise ``ValueError: assignment destination is read-only``.
+    """
+    columns = {}
+    for column in frame.columns:
+        values = frame[column].array
+        if isinstance(values, pd.Categorical):
+            codes = values.codes.copy()
+            codes.flags.writeable = False
+            values = pd.Categorical.from_codes(codes, dtype=values.dtype)
+        else:
+            values = frame[column].to_numpy(copy=True)
+            values.flags.writeable = False
+        columns[column] = values
+    return pd.DataFrame(columns, index=frame.index, copy=False)
+
+class StringTable:
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value: str) -> int:
+        try:
+            return self.codes[value]
+        except KeyError:
+            self.codes[value] = len(self.values)
+            self.values.append(value)
+            return self.codes[value]
+
+    def categorical(self, codes: np.ndarray) -> pd.Categorical:
+        return pd.Categorical.from_codes(codes, categories=pd.Index(self.values, dtype=object))
+
+class BalanceLog:
+    """ Balance of every Account, Asset and Liability plus TOTAL for each month """
+
+    def __init__(self, asset_items: list, statement_dates: list):
+        self.statement_dates = statement_dates
+        self.accounts = StringTable()
+        self.types = StringTable()
+        account_codes = [self.accounts.code(asset_item.name) for asset_item in asset_items] + [self.accounts.code('TOTAL')]
+        type_codes = [self.types.code(asset_item.asset_class) for asset_item in asset_items] + [self.types.code('TOTAL')]
+        self.row_quantity = len(account_codes)
+        month_quantity = len(statement_dates)
+        self.date_ids = np.repeat(np.arange(month_quantity, dtype=np.int32), self.row_quantity)
+        self.account_codes = np.tile(np.array(account_codes, dtype=np.int32), month_quantity)
+        self.type_codes = np.tile(np.array(type_codes, dtype=np.int32), month_quantity)
+        self.cents = np.zeros(month_quantity * self.row_quantity, dtype=np.int64)
+        self.overrides = {}
+
+    def record(self, month_index: int, balances: list):
+        row = month_index * self.row_quantity
+        total = 0
+        exact = True
+        for i, balance in enumerate(balances):
+            cents, override = decimal_to_cents(balance)
+            self.cents[row + i] = cents
+            total += cents
+            if override is not None:
+                self.overrides[row + i] = override
+                exact = False
+        self.cents[row + len(balances)] = total
+        if not exact:
+            self.overrides[row + len(balances)] = sum(balances)
+
+    def copy_months(self, previous, month_quantity: int):
+        """ Start from the first ``month_quantity`` months of ``previous``, which logs the same items """
+        rows = month_quantity * self.row_quantity
+        self.cents[:rows] = previous.cents[:rows]
+        self.overrides = {row: value for row, value in previous.overrides.items() if row < rows}
+
+    def record_cents(self, cents: np.ndarray):
+        """ Store a (months x items) matrix of balances, TOTAL is added here """
+        with_total = np.hstack([cents, cents.sum(axis=1, keepdims=True)])
+        self.cents[:] = with_total.ravel()
+
+    def to_frame(self) -> pd.DataFrame:
+        if len(self.cents) < 1:
+            return pd.DataFrame()
+        balances = cents_to_decimals(self.cents)
+        for row, value in self.overrides.items():
+            balances[row] = value
+        return pd.DataFrame({
+            'balance': balances,
+            'date': np.array(self.statement_dates, dtype=object)[self.date_ids],
+            'account': self.accounts.categorical(self.account_codes),
+            'type': self.types.categorical(self.type_codes),
+        })
+
+class ChangeLog:
+    """ Every Change produced by the forecast, stored column by column """
+
+    def __init__(self, statement_dates: list, capacity: int = INITIAL_CAPACITY):
+        self.statement_dates = statement_dates
+        self.types = StringTable()
+        self.names = StringTable()
+        self.accounts = StringTable()
+        self.size = 0
+        self.first_row = 0 # Rows already flushed to a sink
+        self.date_ids = np.zeros(capacity, dtype=np.int32)
+        self.type_codes = np.zeros(capacity, dtype=np.int32)
+        self.name_codes = np.zeros(capacity, dtype=np.int32)
+        self.account_codes = np.zeros(capacity, dtype=np.int32)
+        self.cents = np.zeros(capacity, dtype=np.int64)
+        self.overrides = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, row: int) -> Change:
+        """ Row ``row`` (since the last flush) as a ``Change``, e.g. for ``to_dict`` """
+        if row < 0:
+            row += self.size
+        if not 0 <= row < self.size:
+            raise IndexError(row)
+        amount = self.overrides.get(row, None)
+        if amount is None:
+            amount = cents_to_decimal(self.cents[row])
+        return Change(
+            self.types.values[self.type_codes[row]],
+            self.names.values[self.name_codes[row]],
+            amount,
+            self.statement_dates[self.date_ids[row]],
+            self.accounts.values[self.account_codes[row]],
+        )
+
+    def __iter__(self):
+        for row in range(self.size):
+            yield self[row]
+
+    def reserve(self, quantity: int):
+        capacity = len(self.cents)
+        if self.size + quantity <= capacity:
+            return
+        capacity = max(capacity, INITIAL_CAPACITY)
+        while capacity < self.size + quantity:
+            capacity *= 2
+        for column in ['date_ids', 'type_codes', 'name_codes', 'account_codes', 'cents']:
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+
+    def append(self, month_index: int, change):
+        self.reserve(1)
+        row = self.size
+        self.date_ids[row] = month_index
+        self.type_codes[row] = self.types.code(change.type)
+        self.name_codes[row] = self.names.code(change.name)
+        self.account_codes[row] = self.accounts.code(change.account)
+        cents, override = decimal_to_cents(change.amount)
+        self.cents[row] = cents
+        if override is not None:
+            self.overrides[row] = override
+        self.size += 1
+
+    def extend(self, month_index: int, changes: list):
+        for change in changes:
+            self.append(month_index, change)
+
+    def extend_arrays(
+        self,
+        date_ids: np.ndarray,
+        type_codes: np.ndarray,
+        name_codes: np.ndarray,
+        account_codes: np.ndarray,
+        cents: np.ndarray):
+        """ Bulk append already coded columns, codes come from the log's tables """
+        quantity = len(cents)
+        self.reserve(quantity)
+        rows = slice(self.size, self.size + quantity)
+        self.date_ids[rows] = date_ids
+        self.type_codes[rows] = type_codes
+        self.name_codes[rows] = name_codes
+        self.account_codes[rows] = account_codes
+        self.cents[rows] = cents
+        self.size += quantity
+
+    def copy_rows(self, previous, row_quantity: int):
+        """ Start from the first ``row_quantity`` rows of ``previous``
+
+        Codes are renumbered so the string tables end up exactly as if those
+        rows had been appended here.
+        """
+        self.reserve(row_quantity)
+        for table_name, column in [('types', 'type_codes'), ('names', 'name_codes'), ('accounts', 'account_codes')]:
+            previous_table = getattr(previous, table_name)
+            table = getattr(self, table_name)
+            codes = getattr(previous, column)[:row_quantity]
+            mapping = np.zeros(len(previous_table.values), dtype=np.int32)
+            for code in np.unique(codes): # Codes are in order of first appearance
+                mapping[code] = table.code(previous_table.values[code])
+            getattr(self, column)[:row_quantity] = mapping[codes]
+        self.date_ids[:row_quantity] = previous.date_ids[:row_quantity]
+        self.cents[:row_quantity] = previous.cents[:row_quantity]
+        self.overrides = {row: value for row, value in previous.overrides.items() if row < row_quantity}
+        self.size = row_quantity
+
+    def reorder(self, order: np.ndarray):
+        """ Put the rows in ``order``, e.g. after appending blocks out of date order """
+        for column in ['date_ids', 'type_codes', 'name_codes', 'account_codes', 'cents']:
+            setattr(self, column, getattr(self, column)[:self.size][order])
+        positions = np.empty(self.size, dtype=np.int64)
+        positions[order] = np.arange(self.size)
+        self.overrides = {int(positions[row]): value for row, value in self.overrides.items()}
+
+    def flush(self, sink):
+        """ Write the rows so far to ``sink`` and start again, keeping the string codes """
+        if self.size > 0:
+            sink.write(self.to_frame())
+        self.first_row += self.size
+        self.size = 0
+        self.overrides = {}
+
+    def to_frame(self) -> pd.DataFrame:
+        if self.size < 1:
+            return pd.DataFrame()
+        amounts = cents_to_decimals(self.cents[:self.size])
+        for row, value in self.overrides.items():
+            amounts[row] = value
+        return pd.DataFrame({
+            'type': self.types.categorical(self.type_codes[:self.size]),
+            'name': self.names.categorical(self.name_codes[:self.size]),
+            'amount': amounts,
+            'date': np.array(self.statement_dates, dtype=object)[self.date_ids[:self.size]],
+            'account': self.accounts.categorical(self.account_codes[:self.size]),
+        }, index=pd.RangeIndex(self.first_row, self.first_row + self.size))
+
+class Rollup:
+    """ float64 summaries of the ``balance_log`` and ``transactions_df`` DataFrames for plotting
+
+    ``transactions`` has one row per type, name, account and month with the
+    money coming in (``inflow``) and going out (``outflow``) as positive
+    floats, ``balances`` is ``balance_log`` with float balances.  Both have
+    ``date`` as datetime64 so charts need no conversions.
+    """
+
+    def __init__(self, balance_log: pd.DataFrame, transactions_df: pd.DataFrame):
+        self.balances = self.float_frame(balance_log, 'balance')
+        if len(transactions_df) < 1:
+            self.transactions = pd.DataFrame(columns=ROLLUP_KEYS + ['year', 'month', 'inflow', 'outflow'])
+            return
+        amounts = np.array(transactions_df['amount'], dtype=np.float64)
+        flows = pd.DataFrame({
+            'type': transactions_df['type'],
+            'name': transactions_df['name'],
+            'account': transactions_df['account'],
+            'date': transactions_df['date'],
+            'inflow': np.where(amounts > 0.0, amounts, 0.0),
+            'outflow': np.where(amounts < 0.0, -amounts, 0.0),
+        })
+        rollup = flows.groupby(ROLLUP_KEYS, observed=True, sort=False)[['inflow', 'outflow']].sum().reset_index()
+        dates = pd.to_datetime(rollup['date'])
+        rollup['date'] = dates
+        rollup.insert(4, 'year', dates.dt.year)
+        rollup.insert(5, 'month', dates.dt.month)
+        self.transactions = rollup
+
+    @staticmethod
+    def float_frame(frame: pd.DataFrame, column: str) -> pd.DataFrame:
+        if len(frame) < 1:
+            return frame
+        return frame.assign(**{
+            column: np.array(frame[column], dtype=np.float64),
+            'date': pd.to_datetime(frame['date']),
+        })
+
+    def read_only(self):
+        """ Make both summaries ``read_only_frame`` copies, returns self """
+        self.balances = read_only_frame(self.balances)
+        self.transactions = read_only_frame(self.transactions)
+        return self
+
+    def flows(self, column: str) -> pd.DataFrame:
+        """ Rows with money in ``column`` ('inflow' or 'outflow'), as ``amount`` """
+        transactions = self.transactions
+        return transactions.loc[transactions[column] > 0.0, ROLLUP_KEYS + ['year', 'month', column]].rename(columns={column: 'amount'})
@@ -0,0 +1,80 @@
+""" Forecast results cache keyed on plan content
+
+``ResultsCache`` is a plain least recently used memo, also used for parsed
+and dumped plan files (see ``YamlHandler``).
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+DEFAULT_MAX_ENTRIES = 16
+
+def canonical_plan(plan_dict: dict) -> str:
+    return json.dumps(plan_dict, sort_keys=True, separators=(',', ':'), default=str)
+
+def plan_fingerprint(plan) -> str:
+    """ Stable hash of everything in ``Plan.to_dict()``
+
+    Equal plans give equal fingerprints across reruns and processes, unlike
+    hashing the object graph.
+    """
+    return dict_fingerprint(plan.to_dict())
+
+def dict_fingerprint(plan_dict: dict) -> str:
+    """ ``plan_fingerprint`` of the plan that ``plan_dict`` came from """
+    return hashlib.sha256(canonical_plan(plan_dict).encode()).hexdigest()
+
+class ResultsCache:
+    """ Least recently used cache, of forecast results unless ``label`` says otherwise """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, label: str = 'Forecast cache'):
+        self.max_entries = max_entries
+        self.label = label
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key):
+        with self.lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_or_build(self, key, build):
+        """ Cached value for ``key``, made by calling ``build()`` on a miss """
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def summary(self) -> str:
+        return f'{self.label}: {self.hits} hits, {self.misses} misses, {len(self.entries)}/{self.max_entries} entries'
+
+RESULTS_CACHE = ResultsCache()
+ARTIFACT_CACHE = ResultsCache(label='Artifact cache') # Downloads and other values derived from results, keyed like RESULTS_CACHE
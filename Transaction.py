@@ -1,9 +1,11 @@
 """ Transaction Object """
 
-import streamlit as st
+from bisect import bisect_left, bisect_right
 from decimal import Decimal
 import datetime
 
+from ui import error
+
 from common import (
     INFLATION_LABEL,
     f2d,
@@ -77,7 +79,6 @@ class Transaction:
             self.interest_profile = plan.interest_profile_names[0]
         else:
             self.interest_profile = interest_profile
-        self.month_count = 0
         self.plan = plan
         self.milestone_start = milestone_start
         if self.milestone_start is not None:
@@ -171,7 +172,7 @@ class Transaction:
         elif self.frequency in [FREQUENCIES[3], FREQUENCIES[4], FREQUENCIES[5]]: # Monthly , Multiple
             value = self.amount
         else:
-            st.error('Cannot compute monthly amount')
+            error('Cannot compute monthly amount')
         return value
     
     @property
@@ -208,30 +209,28 @@ class Transaction:
     def active_account(self) -> str:
         return self.destination_account
 
-    def date_pass(self, date: int) -> bool:
-        date_pass = True
-        if self.start is not None:
-            if date < date_id(self.start):
-                date_pass = False
-        if self.end is not None:
-            if date > date_id(self.end):
-                date_pass = False
-        return date_pass
-
-    def update(self, statement_date: datetime.date, period_index: int, plan) -> list:
-        if not self.date_pass(date_id(statement_date)):
-            return []
-        
-        self.month_count += 1
-        if self.month_gap is not None:
-            if self.month_count<self.month_gap:
-                return []
-            else:
-                self.month_count = 0
-
+    def active_months(self, statement_ids: tuple) -> range:
+        """ Indices of the months whose statement date is between start and end """
+        first = 0 if self.start is None else bisect_left(statement_ids, date_id(self.start))
+        last = len(statement_ids) if self.end is None else bisect_right(statement_ids, date_id(self.end))
+        return range(first, last)
+
+    def firing_months(self, statement_ids: tuple) -> range:
+        """ Indices of the months the transaction is applied, every ``month_gap`` active months """
+        active = self.active_months(statement_ids)
+        if self.month_gap is not None and self.month_gap > 1:
+            return active[self.month_gap - 1::self.month_gap]
+        return active
+
+    def accounts(self, plan) -> tuple:
+        """ Accounts whose balance the transaction changes """
+        return (plan.get_account(self.active_account),)
+
+    def update(self, statement_date: datetime.date, period_index: int, plan, state) -> list:
+        """ Apply the transaction, only called for its ``firing_months`` """
         account = plan.get_account(self.active_account)
-        amount = plan.get_interest_profile(self.interest_profile).calculate_future_value(self.monthly_amount, period_index)
-        account.balance += amount
+        amount = state.money.future_value(plan.get_interest_profile(self.interest_profile), self.monthly_amount, period_index)
+        state.balances[account] += amount
         return [Change(
             self.transaction_type,
             self.name,
@@ -339,28 +338,31 @@ make the forecast data easier to input and operation slightly more intuitive."""
         source = left.selectbox(f'{label} Source Account', options=self.asset_list, index=self.asset_list.index(default))
         return source, destination
 
-    def update(self, statement_date: datetime.date, period_index: int, plan) -> list:
-        if self.date_pass(date_id(statement_date)):
-            amount = plan.get_interest_profile(self.interest_profile).calculate_future_value(self.monthly_amount, period_index)
-            source_account = plan.get_account(self.source_account)
-            source_account.balance -= amount
-            destination_account = plan.get_account(self.destination_account)
-            destination_account.balance += amount
-            return [
-                Change(
-                    self.transaction_type,
-                    self.name,
-                    NEGATIVE_ONE * amount,
-                    statement_date,
-                    source_account.name,
-                ),
-                Change(
-                    self.transaction_type,
-                    self.name,
-                    amount,
-                    statement_date,
-                    destination_account.name,
-                )
-            ]
-        else:
-            return []
\ No newline at end of file
+    def firing_months(self, statement_ids: tuple) -> range:
+        return self.active_months(statement_ids) # Transfers ignore month_gap
+
+    def accounts(self, plan) -> tuple:
+        return (plan.get_account(self.source_account), plan.get_account(self.destination_account))
+
+    def update(self, statement_date: datetime.date, period_index: int, plan, state) -> list:
+        amount = state.money.future_value(plan.get_interest_profile(self.interest_profile), self.monthly_amount, period_index)
+        source_account = plan.get_account(self.source_account)
+        state.balances[source_account] -= amount
+        destination_account = plan.get_account(self.destination_account)
+        state.balances[destination_account] += amount
+        return [
+            Change(
+                self.transaction_type,
+                self.name,
+                -amount,
+                statement_date,
+                source_account.name,
+            ),
+            Change(
+                self.transaction_type,
+                self.name,
+                amount,
+                statement_date,
+                destination_account.name,
+            )
+        ]
\ No newline at end of file
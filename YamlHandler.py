@@ -1,9 +1,27 @@
-""" Handle the configuration file """
+""" Handle the configuration file
+
+Plans are parsed and dumped with the libyaml bindings when PyYAML was built
+with them.  Rendered and parsed plan files are memoized by content, so
+Streamlit reruns with the same upload do not parse it again.
+"""
+
+import hashlib
+import pickle
 
 import yaml
 from jinja2 import Template
 
 from common import f2d
+from ResultsCache import ResultsCache, canonical_plan, dict_fingerprint
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError: # PyYAML without libyaml
+    from yaml import SafeLoader, SafeDumper
+
+PLAN_CACHE_ENTRIES = 8
+PARSED_PLANS = ResultsCache(PLAN_CACHE_ENTRIES, label='Parsed plan cache')
+DUMPED_PLANS = ResultsCache(PLAN_CACHE_ENTRIES, label='Dumped plan cache')
 
 TOP_KEYS = [
     'accounts',
@@ -21,6 +39,12 @@ NEXT_KEYS = [
     'extra_principal',
 ]
 
+def safe_load(text: str):
+    return yaml.load(text, Loader=SafeLoader)
+
+def safe_dump(data) -> str:
+    return yaml.dump(data, Dumper=SafeDumper)
+
 def dump_yaml(data: dict) -> str:
     for key in TOP_KEYS:        
         for i, item in enumerate(data[key]):
@@ -29,7 +53,7 @@ def dump_yaml(data: dict) -> str:
                     data[key][i][next_key] = float(item[next_key])
                 except KeyError:
                     pass # Not a field that needs to be converted
-    return yaml.safe_dump(data)
+    return safe_dump(data)
 
 def split_constants(data: str) -> tuple:
     result = data.split('\n---\n')
@@ -40,11 +64,38 @@ def split_constants(data: str) -> tuple:
     elif part_quantity == 2:
         return result[0], result[1]
 
-def load_yaml(upload_content: str) -> dict:
-    constants, data = split_constants(upload_content)
-    if constants is not None:
-        data = Template(data).render(yaml.safe_load(constants))
-    return yaml.safe_load(data) 
+def load_yaml(upload_content: str, constants: dict = None, cache = PARSED_PLANS) -> dict:
+    """ Render the constants into a plan file and parse it
+
+    :param constants: render with these instead of the file's constants section
+    :param cache: memo of parsed plans, None to always parse; every call gets
+        its own copy of the plan dict
+    """
+    key = (
+        hashlib.sha256(upload_content.encode()).hexdigest(),
+        None if constants is None else canonical_plan(constants),
+    )
+    parsed = cache.get(key) if cache is not None else None
+    if parsed is None:
+        constants_str, data = split_constants(upload_content)
+        if constants is None and constants_str is not None:
+            constants = safe_load(constants_str)
+        if constants_str is not None or constants is not None:
+            data = Template(data).render(constants)
+        parsed = pickle.dumps(safe_load(data))
+        if cache is not None:
+            cache.put(key, parsed)
+    return pickle.loads(parsed)
+
+def dump_plan(plan_dict: dict, cache = DUMPED_PLANS, fingerprint: str = None) -> str:
+    """ ``safe_dump`` of a ``Plan.to_dict()``, memoized by content
+
+    :param fingerprint: ``ResultsCache.dict_fingerprint(plan_dict)`` if the
+        caller already has it
+    """
+    if fingerprint is None:
+        fingerprint = dict_fingerprint(plan_dict)
+    return cache.get_or_build(fingerprint, lambda: safe_dump(plan_dict))
 
 def configuration_update(config: dict) -> dict:
     config['$default_inflation'] = config.get('default_inflation', 2.0)/100.0
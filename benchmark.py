@@ -0,0 +1,219 @@
+""" Forecast benchmarks
+
+Builds a synthetic plan of a configurable size and times each stage on its
+own: ``Plan(...)`` construction, the forecast (what ``calculate`` runs on a
+cache miss), ``Plan.to_dict``, YAML dump/load and ``plan_to_compressed_str``.
+Results, including an ``Instrumentation`` report of one forecast, are printed
+(or written) as JSON so runs can be compared across commits, e.g.
+
+    python benchmark.py --accounts 100 --minimum-balance-accounts 10 --years 50 --output before.json
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+from YamlHandler import dump_yaml, load_yaml
+from Plan import Plan, PLAN_VERSION
+from CompiledPlan import CompiledPlan, ENGINES
+from Money import MONEY_MODES
+from Instrumentation import Instrumentation
+from query_to_plan import plan_to_compressed_str
+from Transaction import FREQUENCIES, DURATION_OPTIONS
+
+PLAN_SIZE = {
+    'accounts': 5,
+    'incomes': 5,
+    'expenses': 20,
+    'transfers': 5,
+    'mortgages': 1,
+    'minimum_balance_accounts': 1,
+    'linear_profiles': 2,
+    'years': 30,
+}
+DEFAULT_REPEATS = 5
+START_YEAR = 2025
+
+def random_date(generator: random.Random, years: int) -> datetime.date:
+    return datetime.date(START_YEAR + generator.randrange(years), generator.randint(1, 12), 1)
+
+def make_transaction(generator: random.Random, name: str, years: int, profile_names: list) -> dict:
+    item = {
+        'name': name,
+        'amount': round(generator.uniform(10.0, 2000.0), 2),
+        'frequency': generator.choice(FREQUENCIES),
+        'duration': generator.choice(DURATION_OPTIONS),
+        'interest_profile': generator.choice(profile_names),
+    }
+    if item['frequency'] == FREQUENCIES[4]: # Every X Months
+        item['month_gap'] = generator.randint(2, 6)
+    if item['duration'] in [DURATION_OPTIONS[1], DURATION_OPTIONS[3], DURATION_OPTIONS[4]]: # has a start
+        item['start'] = random_date(generator, years)
+    if item['duration'] in [DURATION_OPTIONS[1], DURATION_OPTIONS[2]]: # has an end
+        item['end'] = max(item.get('start', random_date(generator, years)), random_date(generator, years))
+    return item
+
+def make_plan(
+    accounts: int = PLAN_SIZE['accounts'],
+    incomes: int = PLAN_SIZE['incomes'],
+    expenses: int = PLAN_SIZE['expenses'],
+    transfers: int = PLAN_SIZE['transfers'],
+    mortgages: int = PLAN_SIZE['mortgages'],
+    minimum_balance_accounts: int = PLAN_SIZE['minimum_balance_accounts'],
+    linear_profiles: int = PLAN_SIZE['linear_profiles'],
+    years: int = PLAN_SIZE['years'],
+    seed: int = 0) -> dict:
+    """ Saved plan (as loaded from YAML) with the given number of items """
+    generator = random.Random(seed)
+    profiles = [
+        {'name': 'No Interest', 'profile_type': 'Constant', 'profile_phases': [{'phase_type': 'Constant', 'rate': 0.0}]},
+        {'name': 'Inflation', 'profile_type': 'Constant', 'profile_phases': [{'phase_type': 'Constant', 'rate': 2.5}]},
+    ]
+    for i in range(linear_profiles):
+        profiles.append({
+            'name': f'Linear #{i + 1}',
+            'profile_type': 'Linear',
+            'profile_phases': [{
+                'phase_type': 'Linear',
+                'rate': 0.0,
+                'start_rate': round(generator.uniform(4.0, 9.0), 2),
+                'end_rate': round(generator.uniform(2.0, 5.0), 2),
+            }],
+        })
+    profile_names = [profile['name'] for profile in profiles]
+    account_names = [f'Account #{i + 1}' for i in range(max(accounts, 1))]
+    account_list = []
+    for i, name in enumerate(account_names):
+        account_list.append({
+            'name': name,
+            'starting_balance': round(generator.uniform(0.0, 50000.0), 2),
+            'interest_profile': generator.choice(profile_names),
+            'enforce_minimum_balance': i < minimum_balance_accounts,
+            'minimum_balance': 1000.0,
+            'priority': generator.randrange(max(accounts, 1)),
+        })
+    plan = {
+        'version': PLAN_VERSION,
+        'configuration': {'start_year': START_YEAR, 'start_month': 1, 'duration': years},
+        'milestones': [{'name': 'Retirement', 'date': datetime.date(START_YEAR + years // 2, 1, 1)}],
+        'interest_profiles': profiles,
+        'accounts': account_list,
+        'assets': [{'name': 'House', 'starting_balance': 300000.0, 'interest_profile': 'Inflation'}],
+        'liabilities': [
+            {'name': f'Mortgage Loan #{i + 1}', 'starting_balance': 200000.0, 'interest_profile': 'No Interest'}
+            for i in range(mortgages)
+        ],
+        'incomes': [],
+        'expenses': [],
+        'transfers': [],
+        'mortgages': [
+            {
+                'name': f'Mortgage #{i + 1}',
+                'starting_balance': 250000.0,
+                'length': 30,
+                'rate': 5.0,
+                'extra_principal': 0.0,
+                'liability': f'Mortgage Loan #{i + 1}',
+                'source_account': generator.choice(account_names),
+            }
+            for i in range(mortgages)
+        ],
+    }
+    for key, quantity in [('incomes', incomes), ('expenses', expenses), ('transfers', transfers)]:
+        for i in range(quantity):
+            item = make_transaction(generator, f'{key.title()} #{i + 1}', years, profile_names)
+            if key == 'incomes':
+                item['destination_account'] = generator.choice(account_names)
+            elif key == 'expenses':
+                item['source_account'] = generator.choice(account_names)
+            else:
+                item['source_account'], item['destination_account'] = generator.sample(account_names, 2) if len(account_names) > 1 else account_names * 2
+            plan[key].append(item)
+    return plan
+
+def time_stage(function, repeats: int) -> dict:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'repeats': repeats,
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(
+    size: dict = PLAN_SIZE,
+    repeats: int = DEFAULT_REPEATS,
+    engine: str = ENGINES[0],
+    money_mode: str = MONEY_MODES[0],
+    seed: int = 0) -> dict:
+    """ Seconds taken by each stage for one synthetic plan, plus the forecast by phase """
+    saved_plan = make_plan(**size, seed=seed)
+    plan = Plan(saved_plan)
+    plan_yaml = dump_yaml(plan.to_dict())
+    stages = {
+        'plan_construction': lambda: Plan(saved_plan),
+        'calculate': lambda: CompiledPlan(plan).run(engine, money_mode),
+        'to_dict': plan.to_dict,
+        'yaml_dump': lambda: dump_yaml(plan.to_dict()),
+        'yaml_load': lambda: load_yaml(plan_yaml, cache=None),
+        'plan_to_compressed_str': lambda: plan_to_compressed_str(plan),
+    }
+    results = {name: time_stage(function, repeats) for name, function in stages.items()}
+    instrumentation = Instrumentation()
+    CompiledPlan(plan).run(engine, money_mode, instrumentation=instrumentation)
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'size': dict(size),
+        'engine': engine,
+        'money_mode': money_mode,
+        'seed': seed,
+        'months': CompiledPlan(plan).month_quantity,
+        'results': results,
+        'calculate_phases': instrumentation.report(),
+    }
+
+def main(args: list = None):
+    parser = argparse.ArgumentParser(description='Benchmark Discrete Financial Forecast on a synthetic plan')
+    for key, default in PLAN_SIZE.items():
+        parser.add_argument(f'--{key.replace("_", "-")}', type=int, default=default)
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINES[0])
+    parser.add_argument('--money-mode', choices=MONEY_MODES, default=MONEY_MODES[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='JSON file for the results (default: print them)')
+    options = parser.parse_args(args)
+    logging.basicConfig(format='%(levelname)s: %(message)s')
+
+    results = run_benchmarks(
+        {key: getattr(options, key) for key in PLAN_SIZE},
+        repeats=options.repeats,
+        engine=options.engine,
+        money_mode=options.money_mode,
+        seed=options.seed,
+    )
+    text = json.dumps(results, indent=2)
+    if options.output is None:
+        print(text)
+    else:
+        with open(options.output, 'w') as fh:
+            fh.write(text + '\n')
+
+if __name__ == '__main__':
+    main()
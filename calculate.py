@@ -1,51 +1,76 @@
 """ Plan computation """
 
 import streamlit as st
-import pandas as pd
 from stqdm import stqdm
 
 from Plan import Plan
-from common import year_month_id, id_to_date, ZERO
-
-@st.cache(suppress_st_warning=True)
-def calculate(plan: Plan) -> tuple:
-    start_date_id = year_month_id(plan.configuration.start_year, plan.configuration.start_month)
-    end_date_id = year_month_id(plan.configuration.end_year, plan.configuration.end_month)
-
-    current_date_id = start_date_id
-    balance_log = []
-    transactions = []
-
-    for current_date_id in stqdm(range(start_date_id, end_date_id), desc='Running forecast through each month'):
-        periods_since_start = current_date_id - start_date_id
-        statement_date = id_to_date(current_date_id + 1) # Show balance as the first of the following month
-        
-        total = ZERO
-        for asset_list in [plan.accounts, plan.assets, plan.liabilities]:
-            for asset_item in asset_list:
-                transactions.extend(asset_item.update(statement_date, periods_since_start, plan))
-
-        for transaction_list in [plan.incomes, plan.expenses, plan.transfers, plan.mortgages]:
-            for item in transaction_list:
-                transactions.extend(item.update(statement_date, periods_since_start, plan))
-
-        for asset_list in [plan.accounts, plan.assets, plan.liabilities]:
-            for asset_item in asset_list:
-                total += asset_item.balance
-                balance_log.append({
-                    'balance': asset_item.balance,
-                    'date': statement_date,
-                    'account': asset_item.name,
-                    'type': asset_item.asset_class,
-                })
-        balance_log.append({
-            'balance': total,
-            'date': statement_date,
-            'account': 'TOTAL',
-            'type': 'TOTAL',
-        })
-
-    st.sidebar.markdown(f'Months assessed: {end_date_id - start_date_id}')
-    balance_log = pd.DataFrame(balance_log)
-    transactions_df = pd.DataFrame([change.to_dict() for change in transactions])
-    return balance_log, transactions_df
\ No newline at end of file
+from CompiledPlan import CompiledPlan, CheckpointStore, ENGINES
+from Money import MONEY_MODES
+from ResultsCache import RESULTS_CACHE, plan_fingerprint
+from Results import Rollup, read_only_frame
+
+CHECKPOINTS_KEY = 'forecast_checkpoints'
+
+def forecast_progress(months):
+    return stqdm(months, desc='Running forecast through each month')
+
+def session_checkpoints() -> CheckpointStore:
+    """ Checkpoints of this browser session's last run, sessions never resume from each other """
+    if CHECKPOINTS_KEY not in st.session_state:
+        st.session_state[CHECKPOINTS_KEY] = CheckpointStore()
+    return st.session_state[CHECKPOINTS_KEY]
+
+def calculate(
+    plan: Plan,
+    engine: str = ENGINES[0],
+    money_mode: str = MONEY_MODES[0],
+    cache = RESULTS_CACHE,
+    checkpoints: CheckpointStore = None,
+    instrumentation = None,
+    sink = None,
+    fingerprint: str = None) -> tuple:
+    """ Forecast the plan, reusing cached or checkpointed results where possible
+
+    Returns (balance_log, transactions_df, rollup), the ``Results.Rollup`` of
+    the two logs is None for runs streamed to a ``sink``.  Results are shared
+    through the cache, so the frames are ``Results.read_only_frame`` copies.
+
+    :param checkpoints: where to resume from and keep this run's
+        checkpoints, the Streamlit session's store by default
+    :param instrumentation: optional ``Instrumentation.Instrumentation`` that
+        records where the forecast time goes (nothing is recorded on a cache hit)
+    :param sink: optional ``ChangeSinks.ChangeSink`` to stream the transaction
+        log to, such runs always forecast every month and are not cached
+    :param fingerprint: ``plan_fingerprint(plan)`` if the caller already has
+        it, results are cached under (fingerprint, engine, money_mode)
+    """
+    if fingerprint is None:
+        fingerprint = plan_fingerprint(plan)
+    key = (fingerprint, engine, money_mode)
+    results = cache.get(key) if sink is None else None
+    if results is not None:
+        st.sidebar.markdown('Forecast unchanged, reusing cached results')
+        st.sidebar.caption(cache.summary)
+        return results
+    if checkpoints is None:
+        checkpoints = session_checkpoints()
+    compiled_plan = CompiledPlan(plan)
+    if engine == ENGINES[2] and not compiled_plan.supports_vectorized:
+        st.warning('Plan uses minimum balances or mortgages, which the Vectorized engine does not support.  Using the Object engine instead.')
+    if money_mode != MONEY_MODES[0] and not compiled_plan.supports_cents:
+        st.warning('Plan has balances that are not whole cents, using Decimal money instead.')
+    results, run_checkpoints = compiled_plan.run_resumable(engine, money_mode, progress=forecast_progress, previous=checkpoints.get(), instrumentation=instrumentation, sink=sink)
+    if sink is None:
+        # Cached results are shared by every session, so they reject writes
+        results = tuple(read_only_frame(frame) for frame in results)
+        results = results + (Rollup(*results).read_only(),)
+        cache.put(key, results)
+    else:
+        results = results + (None,)
+    checkpoints.put(run_checkpoints)
+    if run_checkpoints is not None and run_checkpoints.first_month > 0:
+        st.sidebar.markdown(f'Months assessed: {compiled_plan.month_quantity - run_checkpoints.first_month} (earlier months unchanged)')
+    else:
+        st.sidebar.markdown(f'Months assessed: {compiled_plan.month_quantity}')
+    st.sidebar.caption(cache.summary)
+    return results
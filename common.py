@@ -4,7 +4,7 @@ import datetime
 from decimal import Decimal
 import math
 
-import streamlit as st
+from ui import st
 
 MONTHS = [
     'January',
@@ -24,6 +24,10 @@ INFLATION_LABEL = 'Inflation'
 NEGATIVE_ONE = Decimal('-1.0')
 ZERO = Decimal('0.00')
 DATE_TYPES = ['Manual', 'Milestone']
+# Distance from a half cent below which rounding to cents is settled with Decimal
+HALF_CENT_TOLERANCE = 1e-6
+# Above this many cents float64 can no longer resolve the half cent reliably
+EXACT_CENTS_LIMIT = 1e12
 
 def get_month(label: str = 'Month', holder = None, default: int = 0) -> int:
     if holder is None:
@@ -68,6 +72,18 @@ def get_growth_rate(label_prepend: str = '', default_type: str = None, default_g
 def f2d(value: float):
     return Decimal(str(value))
 
+def f2c(value: float) -> int:
+    """ Round a dollar amount to integer cents exactly like ``round(f2d(value), 2)``
+
+    ``f2d`` rounds the shortest decimal representation of the float half to
+    even.  This only differs from rounding the binary value when it sits
+    (almost) exactly on a half cent, so only those values go through Decimal.
+    """
+    scaled = value * 100.0
+    if abs(abs(scaled - math.floor(scaled)) - 0.5) < HALF_CENT_TOLERANCE or abs(scaled) >= EXACT_CENTS_LIMIT:
+        return int(round(f2d(value), 2).scaleb(2))
+    return round(scaled)
+
 def future_value(investment: Decimal, rate: float, periods: int) -> Decimal:
     """ Compute future value
     :param investment: base amount
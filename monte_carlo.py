@@ -0,0 +1,114 @@
+""" Monte Carlo forecasts
+
+Runs many paths of a plan whose ``Interest Profiles`` include stochastic
+phases and summarizes the TOTAL (net worth) balance per month as percentile
+bands.  Paths are simulated together as NumPy arrays (profiles x paths x
+months) in fixed size chunks, and chunks are spread over a process pool.
+
+Only plans supported by the vectorized engine (no minimum balance
+enforcement, no active mortgages) can be simulated this way.
+
+Sampled returns, negative ones included, are applied to positive balances,
+while the deterministic engines never apply negative interest.  Paths only
+follow the deterministic forecast when its rates are never negative, e.g. a
+negative ``Constant`` rate shrinks Monte Carlo balances but not forecast ones.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common import date_id
+from CompiledPlan import CompiledPlan
+from vectorized import transaction_schedule
+
+DEFAULT_PATHS = 1000
+DEFAULT_PERCENTILES = (5, 50, 95)
+CHUNK_SIZE = 250
+
+def simulate_chunk(compiled_plan: CompiledPlan, path_quantity: int, seed: int, chunk_index: int) -> np.ndarray:
+    """ TOTAL balance in dollars for ``path_quantity`` paths (paths x months) """
+    plan = compiled_plan.plan
+    month_quantity = compiled_plan.month_quantity
+    asset_items = compiled_plan.asset_items
+    transaction_items = compiled_plan.transaction_items
+
+    profile_indices = {profile.name: i for i, profile in enumerate(plan.interest_profiles)}
+    rates = np.stack([
+        profile.sample_rates(path_quantity, seed, chunk_index)[:, :month_quantity]
+        for profile in plan.interest_profiles
+    ])
+    factors = np.stack([
+        profile.sample_factors(path_quantity, seed, chunk_index)[:, :month_quantity]
+        for profile in plan.interest_profiles
+    ])
+    asset_profiles = np.array([profile_indices[asset_item.interest_profile] for asset_item in asset_items], dtype=np.int64)
+    item_profiles = np.array([profile_indices[item.interest_profile] for item in transaction_items], dtype=np.int64)
+    monthly_amounts = np.array([float(item.monthly_amount) for item in transaction_items], dtype=np.float64)
+
+    statement_ids = np.array([date_id(statement_date) for statement_date in compiled_plan.statement_dates], dtype=np.int64)
+    asset_indices = {id(asset_item): i for i, asset_item in enumerate(asset_items)}
+    fires, leg_items, leg_accounts, leg_signs = transaction_schedule(plan, transaction_items, statement_ids, asset_indices)
+    # legs x balances, routes every leg's amount into its balance
+    leg_routes = np.zeros((len(leg_items), len(asset_items)))
+    leg_routes[np.arange(len(leg_items)), leg_accounts] = leg_signs
+
+    # Balances are in cents, rounded like the deterministic engines
+    balance = np.repeat(
+        np.array([float(asset_item.starting_balance.scaleb(2)) for asset_item in asset_items], dtype=np.float64)[:, None],
+        path_quantity,
+        axis=1,
+    )
+    totals = np.zeros((path_quantity, month_quantity))
+    for month in range(month_quantity):
+        interest = np.rint(rates[asset_profiles, :, month] * balance)
+        # Returns, good or bad, apply to positive balances.  Like the
+        # deterministic engines, zero and negative balances never lose interest
+        balance += np.where(balance > 0.0, interest, np.maximum(interest, 0.0))
+        if len(transaction_items) > 0:
+            amounts = np.rint(monthly_amounts[:, None] * factors[item_profiles, :, month] * 100.0) * fires[:, month][:, None]
+            balance += leg_routes.T @ amounts[leg_items, :]
+        totals[:, month] = balance.sum(axis=0) / 100.0
+    return totals
+
+def run_monte_carlo(
+    plan,
+    path_quantity: int = DEFAULT_PATHS,
+    seed: int = None,
+    percentiles: tuple = DEFAULT_PERCENTILES,
+    workers: int = None,
+    mp_context = None) -> pd.DataFrame:
+    """ Percentile bands of the TOTAL balance for each month
+
+    :param workers: worker processes, 1 runs everything in this process (as
+        does a single chunk of paths)
+    :param mp_context: ``multiprocessing`` context for the worker processes,
+        multi-threaded callers such as the Streamlit server should pass a
+        ``spawn`` context since forking a threaded process can deadlock
+    :return: frame with a ``date`` column and one ``P<percentile>`` column each
+    """
+    compiled_plan = plan if isinstance(plan, CompiledPlan) else CompiledPlan(plan)
+    if not compiled_plan.supports_vectorized:
+        raise ValueError('Monte Carlo forecasts do not support minimum balances or mortgages')
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    chunks = [
+        (min(CHUNK_SIZE, path_quantity - start), chunk_index)
+        for chunk_index, start in enumerate(range(0, path_quantity, CHUNK_SIZE))
+    ]
+    if workers == 1 or len(chunks) == 1:
+        results = [simulate_chunk(compiled_plan, quantity, seed, chunk_index) for quantity, chunk_index in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+            futures = [
+                executor.submit(simulate_chunk, compiled_plan, quantity, seed, chunk_index)
+                for quantity, chunk_index in chunks
+            ]
+            results = [future.result() for future in futures]
+    totals = np.vstack(results)
+    bands = np.percentile(totals, percentiles, axis=0)
+    data = {'date': list(compiled_plan.statement_dates)}
+    for percentile, band in zip(percentiles, bands):
+        data[f'P{percentile}'] = band
+    return pd.DataFrame(data)
@@ -1,18 +1,21 @@
 """ Financial Planning App """
 
 import datetime
+import multiprocessing
 import os
 
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import time
 
-from calculate import calculate
+from calculate import calculate, ENGINES
+from Money import MONEY_MODES
 from view_configuration import view_configuration
-from common import dstr, ZERO
-from visualize import visualize_transactions
+from common import dstr
+from visualize import visualize_transactions, downsample, render_mode, DEFAULT_SERIES_POINTS
 from query_to_plan import plan_to_query, plan_to_compressed_str
+from monte_carlo import run_monte_carlo, DEFAULT_PATHS, DEFAULT_PERCENTILES
+from ResultsCache import ARTIFACT_CACHE
 
 st.set_page_config(page_title='Discrete Financial Forecast', layout='wide')
 
@@ -66,25 +69,28 @@ of data this can get annoying.  The checkbox above will disable calculations (wh
 will reduce but not completely eliminate this behavior).  Just don't
 forget to reactive or there will be no results.""")
 
-plan = view_configuration()
+plan, fingerprint = view_configuration()
 
 if disable_calculation:
     st.stop()
 st.sidebar.markdown('# Plan Execution Results')
+engine = st.sidebar.selectbox('Forecast Engine', options=ENGINES, help="""`Vectorized` computes the forecast for all months at once and
+is much faster for long plans.  Plans using `Enforce Minimum Balance` or `Mortgages` always use the month by month `Object` engine.
+`Auto` picks `Vectorized` whenever possible.""")
+money_mode = st.sidebar.selectbox('Money Arithmetic', options=MONEY_MODES, help="""`Cents` runs the month by month `Object` engine
+on whole cents instead of `Decimal` values.  Results are identical, only faster.""")
 start = time.time()
-balance_log, transactions_df = calculate(plan)
-# Due to streamlit cache requirements of output
-tranactions = transactions_df.copy(deep=True)
-
-if len(tranactions) > 0:
-    tranactions['date'] = pd.to_datetime(tranactions['date'])
+balance_log, transactions_df, rollup = calculate(plan, engine=engine, money_mode=money_mode, fingerprint=fingerprint)
+# Results are shared with the forecast cache (their arrays reject writes), and
+# everything derived from them is cached against the same plan fingerprint
+results_key = (fingerprint, engine, money_mode)
 
 st.markdown('# Results')
 
 st.markdown(f'Calculation time: {round(time.time() - start, 1)} seconds')
 final_balance =  dstr(balance_log.loc[balance_log['type'] == 'TOTAL', 'balance'].max())
 st.sidebar.markdown(f"Final Balance: {final_balance}")
-st.markdown("""See the `Final Balance` in the sidbar on the left as well as download buttons for the resulting forecast data:
+st.markdown("""See the `Final Balance` in the sidbar on the left as well as download buttons (`Prepare Data Downloads?`) for the resulting forecast data:
 
 - `Balance Log (CSV)`: The balance of each account at each month interval
 - `Transaction Log (CSV)`: Each transaction for each `Account` and `Liability`
@@ -92,10 +98,12 @@ st.markdown("""See the `Final Balance` in the sidbar on the left as well as down
 You are highly encouraged to double check this app's math and/or experiment with different visualizations""")
 
 st.sidebar.markdown('# Data Downloads')
-balance_csv = balance_log.to_csv()
-transaction_csv = transactions_df.to_csv()
-st.sidebar.download_button('Balance Log (CSV)', balance_csv, file_name=f'{datetime.datetime.today().date()}_balance_log.csv')
-st.sidebar.download_button('Transaction Log (CSV)', transaction_csv, file_name=f'{datetime.datetime.today().date()}_transaction_log.csv')
+if st.sidebar.checkbox('Prepare Data Downloads?', help=""" Writing the logs as CSV takes a while for long plans, so it is only
+done when needed.  The files are kept until the plan changes."""):
+    balance_csv = ARTIFACT_CACHE.get_or_build(results_key + ('balance_csv',), balance_log.to_csv)
+    transaction_csv = ARTIFACT_CACHE.get_or_build(results_key + ('transaction_csv',), transactions_df.to_csv)
+    st.sidebar.download_button('Balance Log (CSV)', balance_csv, file_name=f'{datetime.datetime.today().date()}_balance_log.csv')
+    st.sidebar.download_button('Transaction Log (CSV)', transaction_csv, file_name=f'{datetime.datetime.today().date()}_transaction_log.csv')
 
 st.markdown('## Visualization')
 st.info("""When the graph sections are displayed, they will be re-executed with each modification of the financial plan.
@@ -108,7 +116,7 @@ They are interactive allowing click and drag zooming, hovering over points, and
 clicking the legend.  Hovering over the graph will additionally provide a graph menu in the top right
 with additional options, and an expand icon to view the graph(s) using the full browser window.""")
 
-if len(tranactions) < 1:
+if len(transactions_df) < 1:
     st.warning('Please add some income or expenses to see results Visualization')
 else:
     if st.checkbox('Show Balance Summary View?'):
@@ -117,9 +125,15 @@ else:
         
 `TOTAL` is the periodic sum of all `Accounts`, `Assets`, and `Liabilities` (negative value),
 so Net Worth.""")
-        
+
+        series_points = int(st.number_input('Points per Series', value=DEFAULT_SERIES_POINTS, min_value=0, step=100, help=""" Long plans
+are downsampled before plotting, keeping the shape and the highest and lowest balance of every series.  `0` plots every month."""))
+        balances = ARTIFACT_CACHE.get_or_build(
+            results_key + ('balances', series_points),
+            lambda: downsample(rollup.balances, 'date', 'balance', 'account', series_points),
+        )
         st.plotly_chart(px.line(
-            balance_log,
+            balances,
             x='date',
             y='balance',
             color='account',
@@ -128,21 +142,55 @@ so Net Worth.""")
                 'date': 'Statement Date',
                 'balance': 'Balance ($)',
                 'account': 'Account, Asset, or Balance',
-            }
+            },
+            render_mode=render_mode(len(balances)),
         ), use_container_width=True)
 
+    if st.checkbox('Show Monte Carlo View?'):
+
+        st.markdown("""## Monte Carlo View
+
+Runs many random paths of the forecast using the `Stochastic` `Interest Profiles` and shows the range of `TOTAL` (Net Worth).
+For example, `P5` is the value that 95% of the paths stayed above.""")
+
+        if not any(profile.stochastic for profile in plan.interest_profiles):
+            st.info('Add a `Stochastic` `Interest Profile` to see a range of outcomes.')
+        else:
+            left, right = st.columns(2)
+            path_quantity = int(left.number_input('Monte Carlo Paths', value=DEFAULT_PATHS, min_value=1, step=100))
+            seed = int(right.number_input('Random Seed', value=0, min_value=0, step=1))
+            try:
+                bands = ARTIFACT_CACHE.get_or_build(
+                    (fingerprint, 'monte_carlo', path_quantity, seed),
+                    # Forking the threaded Streamlit server can deadlock, workers are spawned
+                    lambda: run_monte_carlo(plan, path_quantity=path_quantity, seed=seed, mp_context=multiprocessing.get_context('spawn')),
+                )
+            except ValueError as error:
+                st.warning(str(error))
+            else:
+                st.plotly_chart(px.line(
+                    bands,
+                    x='date',
+                    y=[f'P{percentile}' for percentile in DEFAULT_PERCENTILES],
+                    title=f'Net Worth Percentiles over {path_quantity} Paths',
+                    labels={
+                        'date': 'Statement Date',
+                        'value': 'TOTAL ($)',
+                        'variable': 'Percentile',
+                    },
+                    render_mode=render_mode(len(bands) * len(DEFAULT_PERCENTILES)),
+                ), use_container_width=True)
+
     with st.expander('Expense Views'):
         st.markdown('## Expense Views')
-        expenses = tranactions.loc[tranactions['amount'] < ZERO]
-        visualize_transactions(expenses, plan, 'Expense')
+        visualize_transactions(rollup.flows('outflow'), plan, 'Expense')
 
     with st.expander('Income Views'):
         st.markdown('## Income Views')
-        incomes = tranactions.loc[tranactions['amount'] > ZERO]
-        visualize_transactions(incomes, plan, 'Income')
+        visualize_transactions(rollup.flows('inflow'), plan, 'Income')
 
 f"""# Shareable Link
-Copy this link to share with others: [Shareable Link]({URL}{plan_to_compressed_str(plan)})
+Copy this link to share with others: [Shareable Link]({URL}{ARTIFACT_CACHE.get_or_build((fingerprint, 'link'), lambda: plan_to_compressed_str(plan))})
 
 **Note:** 
 
@@ -3,9 +3,9 @@
 from urllib.parse import quote
 import zlib
 import binascii
-import base64
 
-import yaml
+from YamlHandler import safe_load
+from link_codec import encode_plan, decode_plan, is_legacy, link_payload
 
 KEYMAP = {
     'accounts': 0,
@@ -42,6 +42,13 @@ KEYMAP = {
     'liability': 31,
     'transfers': 32,
     'version': 33,
+    'volatility': 34,
+    'seed': 35,
+    'start': 36,
+    'end': 37,
+    'month_gap': 38,
+    'start_rate': 39,
+    'end_rate': 40,
 }
 
 def query_to_plan(params: dict) -> dict:
@@ -116,11 +123,7 @@ def plan_to_query(plan_dict: dict) -> str:
     return '?'+'&'.join(params)
 
 def plan_to_compressed_str(plan) -> str:
-    plan_dict = plan.to_dict()
-    smaller = replace_keys(plan_dict)
-    plan_str = yaml.dump(smaller).encode()
-    compressed = zlib.compress(plan_str)
-    return '?compressed='+base64.urlsafe_b64encode(compressed).decode()
+    return '?compressed=' + encode_plan(plan.to_dict(), KEYMAP)
 
 def replace_keys(dictionary: dict, reverse:bool =False) -> dict:
     new_dict = {}
@@ -143,6 +146,8 @@ def replace_keys(dictionary: dict, reverse:bool =False) -> dict:
     return new_dict
 
 def compressed_str_to_plan(compressed_str: str) -> dict:
-    raw_dict = zlib.decompress(base64.urlsafe_b64decode(compressed_str.encode()))
-    return replace_keys(yaml.safe_load(raw_dict), reverse=True)
+    payload = link_payload(compressed_str)
+    if is_legacy(payload): # Link from before link_codec, zlib compressed YAML
+        return replace_keys(safe_load(zlib.decompress(payload)), reverse=True)
+    return decode_plan(payload, KEYMAP)
 
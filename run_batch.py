@@ -0,0 +1,171 @@
+""" Batch forecast runner
+
+Runs every plan in a directory (``*.yaml``/``*.yml``) or listed in a manifest
+file (one plan path per line, relative to the manifest) across a process pool,
+e.g.
+
+    python run_batch.py plans/ --output-dir results --workers 8
+
+Each plan writes its own logs as in ``run_forecast``, named after the plan's
+path relative to the other plans (``client1/plan.yaml`` writes
+``client1__plan_balance_log.csv``), and ``summary.csv`` lists the output
+prefix, final TOTAL balance, runtime and any error for every plan.  A plan
+that fails is recorded in the summary without stopping the others.  If a
+worker process dies, the plans it took down with the pool are rerun together
+in a fresh pool.  Plans lost again are split in half, each half in a fresh
+pool, until only the plan that kills its worker is recorded as failed.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import logging
+import os
+import time
+import traceback
+
+import pandas as pd
+
+from CompiledPlan import ENGINES
+from Money import MONEY_MODES
+from run_forecast import run_plan_file, final_total, OUTPUT_FORMATS
+
+PLAN_EXTENSIONS = ('.yaml', '.yml')
+SUMMARY_FILE = 'summary.csv'
+SUMMARY_COLUMNS = ['plan', 'prefix', 'status', 'final_total', 'runtime', 'error']
+PREFIX_SEPARATOR = '__'
+
+def find_plans(source: str) -> list:
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, file_name) for file_name in os.listdir(source)
+            if file_name.lower().endswith(PLAN_EXTENSIONS)
+        )
+    manifest_dir = os.path.dirname(source)
+    with open(source, 'r') as fh:
+        lines = [line.strip() for line in fh.readlines()]
+    return [os.path.join(manifest_dir, line) for line in lines if line != '' and not line.startswith('#')]
+
+def output_prefixes(plan_paths: list) -> list:
+    """ Output file prefix for each plan, unique within the batch
+
+    Prefixes are the plan paths relative to the directory the plans share,
+    without extension and with directories joined by ``PREFIX_SEPARATOR``.
+    Plans that still collide (e.g. ``plan.yaml`` and ``plan.yml``) are
+    numbered by their position in the batch.
+    """
+    if len(plan_paths) < 1:
+        return []
+    absolute_paths = [os.path.abspath(plan_path) for plan_path in plan_paths]
+    common_dir = os.path.commonpath([os.path.dirname(plan_path) for plan_path in absolute_paths])
+    prefixes = [
+        os.path.splitext(os.path.relpath(plan_path, common_dir))[0].replace(os.sep, PREFIX_SEPARATOR)
+        for plan_path in absolute_paths
+    ]
+    return [
+        f'{i}{PREFIX_SEPARATOR}{prefix}' if prefixes.count(prefix) > 1 else prefix
+        for i, prefix in enumerate(prefixes)
+    ]
+
+def failed_result(plan_path: str, prefix: str, error: str, runtime: float = None) -> dict:
+    return {
+        'plan': plan_path,
+        'prefix': prefix,
+        'status': 'failed',
+        'final_total': None,
+        'runtime': runtime,
+        'error': error,
+    }
+
+def run_one(plan_path: str, prefix: str, output_dir: str, output_format: str, engine: str, money_mode: str) -> dict:
+    start = time.time()
+    result = {
+        'plan': plan_path,
+        'prefix': prefix,
+        'status': 'ok',
+        'final_total': None,
+        'runtime': None,
+        'error': None,
+    }
+    try:
+        balance_log, _ = run_plan_file(plan_path, output_dir, output_format, engine, money_mode, prefix=prefix)
+        result['final_total'] = final_total(balance_log)
+    except Exception:
+        result = failed_result(plan_path, prefix, traceback.format_exc())
+    result['runtime'] = time.time() - start
+    return result
+
+def run_pool(arguments: list, indices: list, workers: int, results: list) -> list:
+    """ Run the plans at ``indices`` in one pool, returns the ones lost to a dead worker
+
+    Lost plans are recorded as failed in ``results`` until a rerun replaces them.
+    """
+    lost = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(i, executor.submit(run_one, *arguments[i])) for i in indices]
+        for i, future in futures:
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool: # a worker died, every plan not yet finished is lost with it
+                results[i] = failed_result(arguments[i][0], arguments[i][1], traceback.format_exc())
+                lost.append(i)
+            except Exception:
+                results[i] = failed_result(arguments[i][0], arguments[i][1], traceback.format_exc())
+    return lost
+
+def run_batch(
+    plan_paths: list,
+    output_dir: str,
+    workers: int = None,
+    output_format: str = OUTPUT_FORMATS[0],
+    engine: str = ENGINES[0],
+    money_mode: str = MONEY_MODES[0]) -> pd.DataFrame:
+
+    os.makedirs(output_dir, exist_ok=True)
+    arguments = [
+        (plan_path, prefix, output_dir, output_format, engine, money_mode)
+        for plan_path, prefix in zip(plan_paths, output_prefixes(plan_paths))
+    ]
+    results = [None] * len(arguments)
+    # (plan indices, whether they were already lost once)
+    groups = [(list(range(len(arguments))), False)]
+    while len(groups) > 0:
+        group, lost_before = groups.pop()
+        lost = run_pool(arguments, group, workers, results)
+        if len(lost) < 1 or len(group) == 1: # a plan breaking a pool on its own stays failed
+            continue
+        if not lost_before: # most lost plans were only unlucky, rerun them together
+            groups.append((lost, True))
+        else: # broken again, bisect to find the plan killing its worker
+            middle = len(lost) // 2
+            groups.extend([(lost[middle:], True), (lost[:middle], True)])
+    summary = pd.DataFrame(results, columns=SUMMARY_COLUMNS)
+    summary.to_csv(os.path.join(output_dir, SUMMARY_FILE), index=False)
+    return summary
+
+def main(args: list = None):
+    parser = argparse.ArgumentParser(description='Run many Discrete Financial Forecast plans in parallel')
+    parser.add_argument('source', help='Directory of plan files or a manifest listing one plan path per line')
+    parser.add_argument('--output-dir', default='.', help='Directory for the per plan logs and the summary')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default=OUTPUT_FORMATS[0])
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINES[0])
+    parser.add_argument('--money-mode', choices=MONEY_MODES, default=MONEY_MODES[0])
+    options = parser.parse_args(args)
+    logging.basicConfig(format='%(levelname)s: %(message)s')
+
+    start = time.time()
+    summary = run_batch(
+        find_plans(options.source),
+        options.output_dir,
+        workers=options.workers,
+        output_format=options.output_format,
+        engine=options.engine,
+        money_mode=options.money_mode,
+    )
+    failed = summary.loc[summary['status'] != 'ok']
+    print(summary[['plan', 'status', 'final_total', 'runtime']].to_string(index=False))
+    print(f'{len(summary) - len(failed)} of {len(summary)} plans succeeded ({round(time.time() - start, 2)} seconds)')
+
+if __name__ == '__main__':
+    main()
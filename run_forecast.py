@@ -0,0 +1,103 @@
+""" Command line forecast runner
+
+Runs a saved plan without the Streamlit app, e.g.
+
+    python run_forecast.py my_plan.yaml --output-dir results --format parquet
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+from YamlHandler import load_yaml
+from Plan import Plan
+from CompiledPlan import CompiledPlan, ENGINES
+from Money import MONEY_MODES
+from Instrumentation import Instrumentation
+from ChangeSinks import CsvChangeSink, ParquetChangeSink
+
+OUTPUT_FORMATS = [
+    'csv',
+    'parquet',
+]
+
+def load_plan(plan_path: str) -> Plan:
+    with open(plan_path, 'r') as fh:
+        return Plan(load_yaml(fh.read()))
+
+def write_frame(frame, path: str, output_format: str):
+    if output_format == OUTPUT_FORMATS[0]: # csv
+        frame.to_csv(path)
+    elif output_format == OUTPUT_FORMATS[1]: # parquet
+        frame.to_parquet(path)
+    else:
+        raise ValueError(f'Unknown output format {output_format}')
+
+def open_change_sink(path: str, output_format: str, whole_cents: bool = True):
+    """ Sink streaming the transaction log to ``path``, None if it has to be written in one go """
+    if output_format == OUTPUT_FORMATS[0]: # csv
+        return CsvChangeSink(path)
+    elif output_format == OUTPUT_FORMATS[1]: # parquet
+        if not whole_cents: # Decimal places are only known once every amount is in
+            return None
+        return ParquetChangeSink(path)
+    raise ValueError(f'Unknown output format {output_format}')
+
+def run_plan_file(
+    plan_path: str,
+    output_dir: str,
+    output_format: str = OUTPUT_FORMATS[0],
+    engine: str = ENGINES[0],
+    money_mode: str = MONEY_MODES[0],
+    instrumentation: Instrumentation = None,
+    prefix: str = None) -> tuple:
+    """ Forecast a plan file, returns (balance_log, path of the transaction log)
+
+    The transaction log is written to its file while the forecast runs, and
+    removed again if the forecast fails.
+
+    :param prefix: start of the output file names, the plan file name
+        without its extension by default
+    """
+    compiled_plan = CompiledPlan(load_plan(plan_path))
+    if prefix is None:
+        prefix = os.path.splitext(os.path.basename(plan_path))[0]
+    os.makedirs(output_dir, exist_ok=True)
+    balance_path, transaction_path = [os.path.join(output_dir, f'{prefix}_{label}.{output_format}') for label in ['balance_log', 'transaction_log']]
+    sink = open_change_sink(transaction_path, output_format, compiled_plan.supports_cents)
+    try:
+        balance_log, transactions = compiled_plan.run(engine, money_mode, instrumentation=instrumentation, sink=sink)
+    except BaseException:
+        if sink is not None: # No partial transaction log left behind
+            sink.discard()
+        raise
+    if sink is None:
+        write_frame(transactions, transaction_path, output_format)
+    write_frame(balance_log, balance_path, output_format)
+    return balance_log, transaction_path
+
+def final_total(balance_log) -> float:
+    return float(balance_log.loc[balance_log['type'] == 'TOTAL', 'balance'].iloc[-1])
+
+def main(args: list = None):
+    parser = argparse.ArgumentParser(description='Run a Discrete Financial Forecast plan without the web app')
+    parser.add_argument('plan', help='Plan configuration file (YAML)')
+    parser.add_argument('--output-dir', default='.', help='Directory for the balance and transaction logs')
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default=OUTPUT_FORMATS[0])
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINES[0])
+    parser.add_argument('--money-mode', choices=MONEY_MODES, default=MONEY_MODES[0])
+    parser.add_argument('--instrument', action='store_true', help='Print where the forecast time went as JSON')
+    options = parser.parse_args(args)
+    logging.basicConfig(format='%(levelname)s: %(message)s')
+
+    instrumentation = Instrumentation() if options.instrument else None
+    start = time.time()
+    balance_log, _ = run_plan_file(options.plan, options.output_dir, options.output_format, options.engine, options.money_mode, instrumentation)
+    print(f'Final Balance: ${final_total(balance_log):,.2f} ({round(time.time() - start, 2)} seconds)')
+    if instrumentation is not None:
+        print(json.dumps(instrumentation.report(), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+""" Sensitivity sweeps over plan file constants
+
+A plan file can start with a constants section (see
+``YamlHandler.split_constants``) that is rendered into the plan with Jinja.
+``sweep`` runs the plan for every combination of the given constant values
+and returns a tidy table of the constants against the final net worth, e.g.
+
+    sweep(plan_content, {'inflation': constant_range(1.0, 4.0, 7), 'retire_age': [60, 65]})
+
+or from the command line
+
+    python sweep.py my_plan.yaml --constant inflation=1.0:4.0:7 --constant retire_age=60,65 --output sweep.csv
+
+The template is parsed once, and variants that render to the same plan are
+only forecast once.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import itertools
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+import yaml
+from jinja2 import Template
+
+from YamlHandler import split_constants, safe_load
+from Plan import Plan
+from CompiledPlan import CompiledPlan, ENGINES
+from Money import MONEY_MODES
+from run_forecast import final_total
+
+FINAL_NET_WORTH = 'final_net_worth'
+
+def constant_range(start: float, stop: float, quantity: int) -> list:
+    """ ``quantity`` evenly spaced values from ``start`` to ``stop`` (inclusive) """
+    return [float(value) for value in np.linspace(start, stop, quantity)]
+
+def expand_grid(grid: dict) -> list:
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*[grid[name] for name in names])]
+
+def run_rendered(rendered: str, engine: str = ENGINES[0], money_mode: str = MONEY_MODES[0]) -> float:
+    balance_log, _ = CompiledPlan(Plan(safe_load(rendered))).run(engine, money_mode)
+    return final_total(balance_log)
+
+def sweep(
+    plan_content: str,
+    grid: dict,
+    workers: int = None,
+    engine: str = ENGINES[0],
+    money_mode: str = MONEY_MODES[0]) -> pd.DataFrame:
+    """ Final net worth for every combination of constant values in ``grid``
+
+    :param plan_content: plan file text with a constants section
+    :param grid: constant name to the list of values to try, constants not
+        in the grid keep the value from the file
+    :param workers: worker processes, 1 runs everything in this process
+    :return: one row per combination, a column per swept constant and
+        ``final_net_worth``
+    """
+    constants_str, data = split_constants(plan_content)
+    if constants_str is None:
+        raise ValueError('Plan has no constants section to sweep')
+    base_constants = safe_load(constants_str) or {}
+    unknown = [name for name in grid if name not in base_constants]
+    if len(unknown) > 0:
+        raise ValueError(f'Unknown constants: {", ".join(unknown)}')
+    template = Template(data)
+
+    variants = expand_grid(grid)
+    variant_keys = []
+    unique_plans = {}
+    for variant in variants:
+        rendered = template.render({**base_constants, **variant})
+        key = hashlib.sha256(rendered.encode()).hexdigest()
+        variant_keys.append(key)
+        unique_plans.setdefault(key, rendered)
+
+    keys = list(unique_plans.keys())
+    if workers == 1 or len(keys) == 1:
+        finals = [run_rendered(unique_plans[key], engine, money_mode) for key in keys]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            finals = list(executor.map(
+                run_rendered,
+                [unique_plans[key] for key in keys],
+                itertools.repeat(engine),
+                itertools.repeat(money_mode),
+                chunksize=max(1, len(keys) // 64),
+            ))
+    results = dict(zip(keys, finals))
+
+    table = pd.DataFrame(variants, columns=list(grid.keys()))
+    table[FINAL_NET_WORTH] = [results[key] for key in variant_keys]
+    return table
+
+def parse_constant(text: str) -> tuple:
+    """ ``name=start:stop:quantity`` or ``name=value,value,...`` """
+    name, _, values = text.partition('=')
+    if values.count(':') == 2:
+        start, stop, quantity = values.split(':')
+        return name, constant_range(float(start), float(stop), int(quantity))
+    return name, [yaml.safe_load(value) for value in values.split(',')]
+
+def main(args: list = None):
+    parser = argparse.ArgumentParser(description='Sweep the constants of a Discrete Financial Forecast plan')
+    parser.add_argument('plan', help='Plan configuration file (YAML) with a constants section')
+    parser.add_argument('--constant', action='append', default=[], help='name=start:stop:quantity or name=value,value,...')
+    parser.add_argument('--output', default=None, help='CSV file for the sweep table')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINES[0])
+    parser.add_argument('--money-mode', choices=MONEY_MODES, default=MONEY_MODES[0])
+    options = parser.parse_args(args)
+    logging.basicConfig(format='%(levelname)s: %(message)s')
+
+    with open(options.plan, 'r') as fh:
+        plan_content = fh.read()
+    start = time.time()
+    table = sweep(
+        plan_content,
+        dict(parse_constant(text) for text in options.constant),
+        workers=options.workers,
+        engine=options.engine,
+        money_mode=options.money_mode,
+    )
+    if options.output is not None:
+        table.to_csv(options.output, index=False)
+    print(table.to_string(index=False))
+    print(f'{len(table)} variants ({round(time.time() - start, 2)} seconds)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+""" Small hand written plans for focused tests """
+
+import datetime
+
+from Plan import PLAN_VERSION
+
+START_YEAR = 2025
+
+def constant_profile(name: str, rate: float) -> dict:
+    return {'name': name, 'profile_type': 'Constant', 'profile_phases': [{'phase_type': 'Constant', 'rate': rate}]}
+
+def linear_profile(name: str, start_rate: float, end_rate: float) -> dict:
+    return {'name': name, 'profile_type': 'Linear', 'profile_phases': [{'phase_type': 'Linear', 'rate': 0.0, 'start_rate': start_rate, 'end_rate': end_rate}]}
+
+def small_plan(years: int = 5, **sections) -> dict:
+    """ Two accounts with a salary, rent and a savings transfer, ``sections`` replace any top level key """
+    saved_plan = {
+        'version': PLAN_VERSION,
+        'configuration': {'start_year': START_YEAR, 'start_month': 0, 'duration': years},
+        'milestones': [{'name': 'Move', 'date': datetime.date(START_YEAR + 2, 7, 1)}],
+        'interest_profiles': [
+            constant_profile('No Interest', 0.0),
+            constant_profile('Inflation', 2.5),
+            linear_profile('Market', 8.0, 4.0),
+        ],
+        'accounts': [
+            {'name': 'Checking', 'starting_balance': 5000.0, 'interest_profile': 'No Interest', 'priority': 2},
+            {'name': 'Savings', 'starting_balance': 20000.0, 'interest_profile': 'Market', 'priority': 1},
+        ],
+        'assets': [],
+        'liabilities': [],
+        'incomes': [
+            {'name': 'Salary', 'amount': 4000.0, 'frequency': 'Monthly', 'duration': 'Forever', 'destination_account': 'Checking', 'interest_profile': 'Inflation'},
+        ],
+        'expenses': [
+            {'name': 'Rent', 'amount': 1500.0, 'frequency': 'Monthly', 'duration': 'End Date Only', 'milestone_end': 'Move', 'source_account': 'Checking', 'interest_profile': 'Inflation'},
+        ],
+        'transfers': [
+            {'name': 'Save', 'amount': 1000.0, 'frequency': 'Monthly', 'duration': 'Forever', 'source_account': 'Checking', 'destination_account': 'Savings', 'interest_profile': 'No Interest'},
+        ],
+        'mortgages': [],
+    }
+    saved_plan.update(sections)
+    return saved_plan
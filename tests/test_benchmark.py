@@ -0,0 +1,44 @@
+""" Benchmark plan generator and stage timings """
+
+import json
+
+from Plan import Plan
+from CompiledPlan import CompiledPlan
+
+import benchmark
+
+TINY_SIZE = {
+    'accounts': 3,
+    'incomes': 2,
+    'expenses': 4,
+    'transfers': 2,
+    'mortgages': 1,
+    'minimum_balance_accounts': 1,
+    'linear_profiles': 1,
+    'years': 2,
+}
+
+def test_make_plan_size_and_seed():
+    saved_plan = benchmark.make_plan(**TINY_SIZE, seed=3)
+    assert saved_plan == benchmark.make_plan(**TINY_SIZE, seed=3)
+    assert saved_plan != benchmark.make_plan(**TINY_SIZE, seed=4)
+    for key in ['accounts', 'incomes', 'expenses', 'transfers', 'mortgages']:
+        assert len(saved_plan[key]) == TINY_SIZE[key]
+    assert sum(account['enforce_minimum_balance'] for account in saved_plan['accounts']) == 1
+    assert CompiledPlan(Plan(saved_plan)).month_quantity == 24
+
+def test_run_benchmarks_times_every_stage():
+    results = benchmark.run_benchmarks(TINY_SIZE, repeats=2)
+    assert set(results['results']) == {'plan_construction', 'calculate', 'to_dict', 'yaml_dump', 'yaml_load', 'plan_to_compressed_str'}
+    for timing in results['results'].values():
+        assert timing['repeats'] == 2
+        assert 0.0 <= timing['min'] <= timing['median']
+    assert results['size'] == TINY_SIZE
+    assert results['months'] == 24
+
+def test_main_writes_json(tmp_path):
+    output = tmp_path / 'results.json'
+    benchmark.main(['--accounts', '2', '--expenses', '3', '--years', '1', '--repeats', '1', '--output', str(output)])
+    results = json.loads(output.read_text())
+    assert results['size']['accounts'] == 2
+    assert results['months'] == 12
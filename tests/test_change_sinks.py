@@ -0,0 +1,92 @@
+""" Streamed transaction logs must match the ones built in memory """
+
+import os
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from benchmark import make_plan
+from Plan import Plan
+from CompiledPlan import CompiledPlan, ENGINES
+from Money import MONEY_MODES
+from ChangeSinks import ChangeSink, MemoryChangeSink, CsvChangeSink, ParquetChangeSink
+from YamlHandler import dump_yaml
+import run_forecast
+
+CHUNK_ROWS = 100
+
+class CountingSink(MemoryChangeSink):
+
+    def __init__(self):
+        super().__init__()
+        self.sizes = []
+
+    def write(self, frame: pd.DataFrame):
+        self.sizes.append(len(frame))
+        super().write(frame)
+
+def vectorized_plan() -> CompiledPlan:
+    compiled_plan = CompiledPlan(Plan(make_plan(mortgages=0, minimum_balance_accounts=0, years=20)))
+    assert compiled_plan.supports_vectorized
+    return compiled_plan
+
+@pytest.mark.parametrize('engine', [ENGINES[1], ENGINES[2]])
+def test_memory_sink_matches_frame(engine):
+    compiled_plan = vectorized_plan()
+    balance_log, transactions_df = compiled_plan.run(engine)
+    sink = CountingSink()
+    streamed_balance_log, streamed_transactions = compiled_plan.run(engine, sink=sink, chunk_rows=CHUNK_ROWS)
+    pdt.assert_frame_equal(streamed_balance_log, balance_log)
+    pdt.assert_frame_equal(streamed_transactions, transactions_df)
+    assert len(sink.sizes) > 1
+    # Chunks hold at most one month more than chunk_rows
+    assert max(sink.sizes) < 2 * CHUNK_ROWS
+
+@pytest.mark.parametrize('engine', [ENGINES[1], ENGINES[2]])
+def test_csv_sink_matches_to_csv(engine, tmp_path):
+    compiled_plan = vectorized_plan()
+    _, transactions_df = compiled_plan.run(engine)
+    path = str(tmp_path / 'transaction_log.csv')
+    assert compiled_plan.run(engine, sink=CsvChangeSink(path), chunk_rows=CHUNK_ROWS)[1] == path
+    with open(path, 'r', newline='') as fh:
+        assert fh.read() == transactions_df.to_csv()
+
+def test_sink_is_abstract():
+    with pytest.raises(TypeError):
+        ChangeSink()
+
+@pytest.mark.parametrize('engine', [ENGINES[1], ENGINES[2]])
+def test_parquet_sink_matches_frame(engine, tmp_path):
+    pytest.importorskip('pyarrow')
+    compiled_plan = vectorized_plan()
+    _, transactions_df = compiled_plan.run(engine, MONEY_MODES[1])
+    path = str(tmp_path / 'transaction_log.parquet')
+    assert compiled_plan.run(engine, MONEY_MODES[1], sink=ParquetChangeSink(path), chunk_rows=CHUNK_ROWS)[1] == path
+    streamed = pd.read_parquet(path)
+    expected = transactions_df.reset_index(drop=True)
+    assert list(streamed.columns) == list(expected.columns)
+    for column in ['type', 'name', 'account']:
+        assert streamed[column].astype(str).tolist() == expected[column].astype(str).tolist()
+    assert streamed['amount'].tolist() == expected['amount'].tolist()
+    assert pd.to_datetime(streamed['date']).tolist() == pd.to_datetime(expected['date']).tolist()
+
+@pytest.mark.parametrize('output_format', run_forecast.OUTPUT_FORMATS)
+def test_failed_run_leaves_no_transaction_log(output_format, tmp_path, monkeypatch):
+    if output_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    plan_path = str(tmp_path / 'plan.yaml')
+    with open(plan_path, 'w') as fh:
+        fh.write(dump_yaml(Plan(make_plan(years=2)).to_dict()))
+    _, transactions_df = CompiledPlan(run_forecast.load_plan(plan_path)).run(ENGINES[1])
+
+    def failing_run(self, *args, sink=None, **kwargs):
+        sink.write(transactions_df.head(10))
+        assert os.path.exists(sink.path)
+        raise RuntimeError('forecast failed')
+
+    monkeypatch.setattr(CompiledPlan, 'run', failing_run)
+    output_dir = str(tmp_path / 'output')
+    with pytest.raises(RuntimeError):
+        run_forecast.run_plan_file(plan_path, output_dir, output_format)
+    assert os.listdir(output_dir) == []
@@ -0,0 +1,62 @@
+""" Every way of running a forecast must give the object engine's results to the cent """
+
+import datetime
+
+import pandas.testing as pdt
+import pytest
+
+from benchmark import make_plan
+from Plan import Plan
+from CompiledPlan import CompiledPlan, ENGINES
+
+SEEDS = range(5)
+
+def assert_results_equal(results, expected):
+    # Categories are interned in the order each engine first meets them
+    for frame, expected_frame in zip(results, expected):
+        pdt.assert_frame_equal(frame, expected_frame, check_categorical=False)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_vectorized_matches_object(seed):
+    compiled_plan = CompiledPlan(Plan(make_plan(mortgages=0, minimum_balance_accounts=0, years=20, seed=seed)))
+    assert compiled_plan.supports_vectorized
+    assert_results_equal(compiled_plan.run(ENGINES[2]), compiled_plan.run(ENGINES[1]))
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_auto_falls_back_to_object(seed):
+    compiled_plan = CompiledPlan(Plan(make_plan(years=20, seed=seed)))
+    assert not compiled_plan.supports_vectorized
+    assert_results_equal(compiled_plan.run(ENGINES[0]), compiled_plan.run(ENGINES[1]))
+
+@pytest.mark.parametrize('asset_list', ['assets', 'liabilities'])
+def test_minimum_balance_on_any_asset_item(asset_list):
+    saved_plan = make_plan(mortgages=0, minimum_balance_accounts=0, years=20)
+    saved_plan[asset_list] = [{
+        'name': 'Minimum',
+        'starting_balance': 100.0,
+        'interest_profile': 'No Interest',
+        'enforce_minimum_balance': True,
+        'minimum_balance': 5000.0,
+    }]
+    compiled_plan = CompiledPlan(Plan(saved_plan))
+    assert not compiled_plan.supports_vectorized
+    assert_results_equal(compiled_plan.run(ENGINES[0]), compiled_plan.run(ENGINES[1]))
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_zero_month_forecast(engine):
+    saved_plan = make_plan(years=1)
+    saved_plan['configuration']['duration'] = 0
+    balance_log, transactions_df = CompiledPlan(Plan(saved_plan)).run(engine)
+    assert len(balance_log) == 0
+    assert len(transactions_df) == 0
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_resumed_run_matches_fresh_run(seed):
+    saved_plan = make_plan(years=20, seed=seed)
+    _, checkpoints = CompiledPlan(Plan(saved_plan)).run_resumable(ENGINES[1])
+    saved_plan['expenses'][0].update({'duration': 'Start Date Only', 'start': datetime.date(2035, 6, 1)})
+    compiled_plan = CompiledPlan(Plan(saved_plan))
+    results, resumed = compiled_plan.run_resumable(ENGINES[1], previous=checkpoints)
+    assert resumed.first_month > 0
+    assert_results_equal(results, compiled_plan.run(ENGINES[1]))
+    assert compiled_plan.run_resumable(ENGINES[1], keep_checkpoints=False)[1] is None
@@ -0,0 +1,17 @@
+""" Instrumentation reports must account for every change a forecast makes """
+
+import pytest
+
+from benchmark import make_plan
+from Plan import Plan
+from CompiledPlan import CompiledPlan, ENGINES
+from Instrumentation import Instrumentation
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_changes_counted(engine):
+    compiled_plan = CompiledPlan(Plan(make_plan(mortgages=0, minimum_balance_accounts=0, years=10)))
+    instrumentation = Instrumentation()
+    _, transactions_df = compiled_plan.run(engine, instrumentation=instrumentation)
+    report = instrumentation.report()
+    assert report['changes'] == len(transactions_df)
+    assert report['months'] == compiled_plan.month_quantity
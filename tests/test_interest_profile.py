@@ -0,0 +1,54 @@
+""" Compiled interest profiles must match building the profile phase by phase """
+
+from decimal import Decimal
+import random
+
+from common import f2d
+from Configuration import Configuration
+from InterestProfile import InterestProfile
+
+from plans import START_YEAR
+
+def linear_profile(configuration: Configuration) -> InterestProfile:
+    return InterestProfile(1, configuration, name='Market', profile_type='Linear', profile_phases=[
+        {'phase_type': 'Linear', 'rate': 0.0, 'start_rate': 9.0, 'end_rate': 3.0},
+    ])
+
+def test_rates_match_phases():
+    profile = linear_profile(Configuration(START_YEAR, 0, 20))
+    expected = profile.interest_phases[0].get_profile(profile.start, profile.end)
+    assert len(expected) == 240
+    assert list(profile.rates) == expected
+    assert [profile.get_rate(i) for i in range(len(expected))] == expected
+    assert profile.get_profile() == expected
+
+def test_growth_is_running_product():
+    profile = linear_profile(Configuration(START_YEAR, 0, 20))
+    current = 1.0
+    assert profile.get_growth(0) == 1.0
+    for i, rate in enumerate(profile.build_profile()):
+        current = current * (1.0 + rate)
+        assert profile.get_growth(i + 1) == current
+
+def test_recompiled_when_configuration_changes():
+    configuration = Configuration(START_YEAR, 0, 20)
+    profile = linear_profile(configuration)
+    assert len(profile.rates) == 240
+    configuration.duration = 10
+    assert len(profile.rates) == 120
+    assert list(profile.rates) == profile.build_profile()
+
+def looped_future_value(profile: InterestProfile, value: Decimal, period_index: int) -> Decimal:
+    """ calculate_future_value before the growth table, stepping through every period """
+    current_value = float(value)
+    for rate in profile.build_profile()[:period_index]:
+        current_value = current_value * (1.0 + rate)
+    return round(f2d(current_value), 2)
+
+def test_future_value_matches_loop():
+    profile = linear_profile(Configuration(START_YEAR, 0, 30))
+    generator = random.Random(0)
+    for _ in range(2000):
+        value = f2d(round(generator.uniform(-5000.0, 5000.0), 2))
+        period_index = generator.randrange(360)
+        assert profile.calculate_future_value(value, period_index) == looped_future_value(profile, value, period_index)
@@ -0,0 +1,68 @@
+""" Shareable links: the binary codec and links made before it """
+
+import base64
+import datetime
+
+import pytest
+
+from Plan import Plan
+from query_to_plan import KEYMAP, compressed_str_to_plan, plan_to_compressed_str
+from link_codec import CODEC_VERSION, encode_plan, decode_plan, link_payload, write_varint, read_varint, zigzag, unzigzag
+
+from plans import small_plan
+
+# ?compressed= link of mortgage_plan() made with the zlib compressed YAML encoder
+LEGACY_LINK = (
+    'eJx9UktrAjEQvu-vmJsnJZlN1jVX21JBW6jH0kNoY13cJrAbBP99J4_KqmthIZtMvsfMF6aKKXAF'
+    'O932pgBABS8OVtabzvSeDoSC5d58Hhr7TTupAGmpFEjG2IzdgDe6O5iM2-ojofoE4wmGLOHmCt4_'
+    'ilrR6YLIaOFMAQsrD7dQFhyDN-Jc2V2rfeNson0z1ifYo_2CB-0NvNr2FKAl6cjITxu6unHW71NJ'
+    'ht0xuOTVoCVej4tsdau7U5J5cp05mi4LCDYusBiwIgus4nqWyEO_JEd6S2d7r2MnVCDeRIpiUIoU'
+    'Q2P_EuBMjhKcIxmi1401ursSByipizr_CwpEnE1lAMo8r5tX8ux-DKydtjlokZPGKs8ijx_nMd_5'
+    'lNHHC6xzOeAzVLLzjKuL5xesVqnNRYw6XirJaBl_-NBGifes0sM0Y9HyO9FemghJ_z3tklATNuOT'
+    '4hfJD8X9'
+)
+
+def mortgage_plan() -> dict:
+    return small_plan(
+        liabilities=[{'name': 'Home Loan', 'starting_balance': 240000.0, 'interest_profile': 'No Interest'}],
+        mortgages=[{'name': 'Home', 'starting_balance': 250000.0, 'length': 30, 'rate': 6.5, 'liability': 'Home Loan', 'source_account': 'Checking', 'extra_principal': 150.0}],
+    )
+
+def test_legacy_link_decodes():
+    assert compressed_str_to_plan(LEGACY_LINK) == Plan(mortgage_plan()).to_dict()
+
+def test_plan_round_trip():
+    saved_plan = mortgage_plan()
+    saved_plan['accounts'].append({'name': 'Épargne 🏠', 'starting_balance': 12345678.91, 'interest_profile': 'Market', 'enforce_minimum_balance': True, 'minimum_balance': 2500.0, 'priority': 0})
+    saved_plan['expenses'].append({'name': 'Tuition', 'amount': 1234.567, 'frequency': 'Every X Months', 'month_gap': 6, 'duration': 'Date Range', 'start': datetime.date(2026, 9, 15), 'end': datetime.date(2029, 6, 1), 'source_account': 'Savings', 'interest_profile': 'Inflation'})
+    plan_dict = Plan(saved_plan).to_dict()
+    link = plan_to_compressed_str(Plan(saved_plan))
+    assert link.startswith('?compressed=')
+    decoded = compressed_str_to_plan(link[len('?compressed='):])
+    assert decoded == plan_dict
+    assert Plan(decoded).to_dict() == plan_dict
+    assert [type(value) for value in decoded['mortgages'][0].values()] == [type(value) for value in plan_dict['mortgages'][0].values()]
+    assert len(link) < len('?compressed=' + LEGACY_LINK)
+
+def test_values_round_trip():
+    values = {
+        'integers': [0, 1, -1, 63, -64, 127, 128, -129, 2**40, -2**40],
+        'floats': [0.0, -0.01, 0.1 + 0.2, 1e20, -3.75, 1/3],
+        'dates': [datetime.date(1999, 12, 1), datetime.date(2100, 2, 28)],
+        'flags': [True, False, None],
+        'unmapped key': {'name': 'x', 'nested': [{'a': 1}, {'b': 2}]},
+    }
+    decoded = decode_plan(link_payload(encode_plan(values, KEYMAP)), KEYMAP)
+    assert decoded == values
+    assert [type(value) for value in decoded['integers'] + decoded['floats']] == [type(value) for value in values['integers'] + values['floats']]
+    for value in values['integers']:
+        out = bytearray()
+        write_varint(out, zigzag(value))
+        assert unzigzag(read_varint(bytes(out), 0)[0]) == value
+
+def test_unknown_version_rejected():
+    payload = bytearray(link_payload(plan_to_compressed_str(Plan(small_plan()))[len('?compressed='):]))
+    assert payload[0] == CODEC_VERSION
+    payload[0] = CODEC_VERSION + 1
+    with pytest.raises(ValueError, match='Unsupported link version'):
+        compressed_str_to_plan(base64.urlsafe_b64encode(bytes(payload)).decode())
@@ -0,0 +1,73 @@
+""" Minimum balance withdrawals must match scanning every account by priority """
+
+import pandas.testing as pdt
+import pytest
+
+from Assets import BaseAsset
+from Change import Change
+from Plan import Plan
+from CompiledPlan import CompiledPlan, ENGINES
+from Money import MONEY_MODES
+
+from plans import small_plan
+
+def scanned_minimum_balance(self, statement_date, period_index: int, plan, state) -> list:
+    """ Withdrawals as before the precomputed order, sorting and checking every account each time """
+    if self in state.unable_to_balance:
+        return []
+    money = state.money
+    balances = state.balances
+    transactions = []
+    minimum_balance = money.from_decimal(self.minimum_balance)
+    delta_needed = minimum_balance - balances[self]
+    if delta_needed <= money.zero:
+        return []
+    accounts = sorted([account for account in plan.accounts if account.name != self.name], key=lambda account: account.priority)
+    for account in accounts:
+        balance = balances[account]
+        if balance <= money.zero:
+            continue
+        transfer_amount = min(balance, delta_needed)
+        delta_needed -= transfer_amount
+        balances[account] -= transfer_amount
+        balances[self] += transfer_amount
+        transactions.extend([
+            Change('minimum_balance', self.name + '_min_balance', transfer_amount, statement_date, self.name),
+            Change('minimum_balance', self.name + '_min_balance', -transfer_amount, statement_date, account.name),
+        ])
+        if delta_needed <= money.zero:
+            break
+    else:
+        state.unable_to_balance.add(self)
+    return transactions
+
+def minimum_balance_plan() -> dict:
+    """ Checking is topped up from Savings then Brokerage, which drain and are paid into again """
+    return small_plan(
+        years=6,
+        accounts=[
+            {'name': 'Checking', 'starting_balance': 1000.0, 'interest_profile': 'No Interest', 'priority': 0, 'enforce_minimum_balance': True, 'minimum_balance': 2000.0},
+            {'name': 'Brokerage', 'starting_balance': 3000.0, 'interest_profile': 'Market', 'priority': 2},
+            {'name': 'Savings', 'starting_balance': 5000.0, 'interest_profile': 'Inflation', 'priority': 1},
+        ],
+        incomes=[
+            {'name': 'Salary', 'amount': 2500.0, 'frequency': 'Monthly', 'duration': 'Forever', 'destination_account': 'Checking', 'interest_profile': 'No Interest'},
+            {'name': 'Bonus', 'amount': 12000.0, 'frequency': 'Yearly', 'duration': 'Forever', 'destination_account': 'Savings', 'interest_profile': 'No Interest'},
+        ],
+        expenses=[
+            {'name': 'Rent', 'amount': 3200.0, 'frequency': 'Monthly', 'duration': 'Forever', 'source_account': 'Checking', 'interest_profile': 'Inflation'},
+        ],
+        transfers=[
+            {'name': 'Invest', 'amount': 300.0, 'frequency': 'Monthly', 'duration': 'Forever', 'source_account': 'Savings', 'destination_account': 'Brokerage', 'interest_profile': 'No Interest'},
+        ],
+    )
+
+@pytest.mark.parametrize('money_mode', MONEY_MODES)
+def test_withdrawals_match_scanning(money_mode, monkeypatch):
+    compiled_plan = CompiledPlan(Plan(minimum_balance_plan()))
+    results = compiled_plan.run(ENGINES[1], money_mode)
+    withdrawals = results[1].loc[results[1]['type'] == 'minimum_balance']
+    assert withdrawals['account'].nunique() == 3 # both sources are drawn on
+    monkeypatch.setattr(BaseAsset, 'maintain_minimum_balance', scanned_minimum_balance)
+    for frame, expected_frame in zip(results, compiled_plan.run(ENGINES[1], money_mode)):
+        pdt.assert_frame_equal(frame, expected_frame, check_categorical=False)
@@ -0,0 +1,32 @@
+""" Cents money mode must give the Decimal mode's results exactly """
+
+import pandas.testing as pdt
+import pytest
+
+from benchmark import make_plan
+from Plan import Plan
+from CompiledPlan import CompiledPlan, ENGINES
+from Money import MONEY_MODES
+
+SEEDS = range(5)
+
+def assert_modes_equal(saved_plan: dict):
+    compiled_plan = CompiledPlan(Plan(saved_plan))
+    assert compiled_plan.supports_cents
+    decimal_results = compiled_plan.run(ENGINES[1], MONEY_MODES[0])
+    cents_results = compiled_plan.run(ENGINES[1], MONEY_MODES[1])
+    for frame, expected_frame in zip(cents_results, decimal_results):
+        pdt.assert_frame_equal(frame, expected_frame)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_cents_matches_decimal(seed):
+    saved_plan = make_plan(mortgages=2, minimum_balance_accounts=2, years=30, seed=seed)
+    assert_modes_equal(saved_plan)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_cents_matches_decimal_shared_liability(seed):
+    # Mortgages paying down the same liability are not amortized up front
+    saved_plan = make_plan(mortgages=2, minimum_balance_accounts=2, years=30, seed=seed)
+    saved_plan['mortgages'][1]['liability'] = saved_plan['mortgages'][0]['liability']
+    saved_plan['mortgages'][1]['extra_principal'] = 250.0
+    assert_modes_equal(saved_plan)
@@ -0,0 +1,57 @@
+""" Monte Carlo paths must scatter around the deterministic forecast """
+
+import multiprocessing
+
+import pandas.testing as pdt
+import pytest
+
+from Plan import Plan, PLAN_VERSION
+from CompiledPlan import CompiledPlan
+from InterestProfile import STOCHASTIC_PHASE_TYPES
+from monte_carlo import run_monte_carlo
+
+STARTING_BALANCE = 100000.0
+
+def market_plan(phase_type: str, volatility: float, years: int) -> CompiledPlan:
+    return CompiledPlan(Plan({
+        'version': PLAN_VERSION,
+        'configuration': {'start_year': 2025, 'start_month': 0, 'duration': years},
+        'milestones': [],
+        'interest_profiles': [
+            {'name': 'No Interest', 'profile_type': 'Constant', 'profile_phases': [{'phase_type': 'Constant', 'rate': 0.0}]},
+            {'name': 'Market', 'profile_type': 'Stochastic', 'profile_phases': [{'phase_type': phase_type, 'rate': 7.0, 'volatility': volatility}]},
+        ],
+        'accounts': [{'name': 'Brokerage', 'starting_balance': STARTING_BALANCE, 'interest_profile': 'Market'}],
+        'assets': [],
+        'liabilities': [],
+        'incomes': [],
+        'expenses': [{'name': 'Fees', 'amount': 25.0, 'frequency': 'Monthly', 'duration': 'Forever', 'source_account': 'Brokerage', 'interest_profile': 'No Interest'}],
+        'transfers': [],
+        'mortgages': [],
+    }))
+
+def deterministic_totals(compiled_plan: CompiledPlan) -> list:
+    balance_log, _ = compiled_plan.run()
+    return [float(balance) for balance in balance_log.loc[balance_log['type'] == 'TOTAL', 'balance']]
+
+@pytest.mark.parametrize('phase_type', STOCHASTIC_PHASE_TYPES)
+def test_median_near_deterministic(phase_type):
+    compiled_plan = market_plan(phase_type, 15.0, 10)
+    final_total = deterministic_totals(compiled_plan)[-1]
+    bands = run_monte_carlo(compiled_plan, path_quantity=2000, seed=1, workers=1).iloc[-1]
+    assert bands['P5'] < final_total < bands['P95']
+    assert bands['P5'] < STARTING_BALANCE # losing months must be able to lose money
+    # Volatility drag puts the median a little below the mean rate's path
+    assert 0.8 * final_total < bands['P50'] < 1.05 * final_total
+
+def test_zero_volatility_is_deterministic():
+    compiled_plan = market_plan(STOCHASTIC_PHASE_TYPES[0], 0.0, 10)
+    bands = run_monte_carlo(compiled_plan, path_quantity=10, seed=1, workers=1)
+    for percentile in ['P5', 'P50', 'P95']:
+        assert list(bands[percentile]) == pytest.approx(deterministic_totals(compiled_plan), abs=0.01)
+
+def test_spawned_workers_match_in_process():
+    compiled_plan = market_plan(STOCHASTIC_PHASE_TYPES[1], 15.0, 5)
+    in_process = run_monte_carlo(compiled_plan, path_quantity=600, seed=3, workers=1)
+    spawned = run_monte_carlo(compiled_plan, path_quantity=600, seed=3, workers=2, mp_context=multiprocessing.get_context('spawn'))
+    pdt.assert_frame_equal(spawned, in_process)
@@ -0,0 +1,45 @@
+""" Precomputed mortgage payments must match paying month by month """
+
+import pandas.testing as pdt
+import pytest
+
+from Plan import Plan
+from CompiledPlan import CompiledPlan, ENGINES
+from Money import MONEY_MODES
+
+from plans import small_plan, constant_profile
+
+def mortgage_plan() -> dict:
+    """ A long mortgage on an interest bearing loan and a short one that is paid off early """
+    saved_plan = small_plan(
+        years=6,
+        liabilities=[
+            {'name': 'Home Loan', 'starting_balance': 240000.0, 'interest_profile': 'No Interest'},
+            {'name': 'Car Loan', 'starting_balance': 18000.0, 'interest_profile': 'Late Fees'},
+        ],
+        mortgages=[
+            {'name': 'Home', 'starting_balance': 250000.0, 'length': 30, 'rate': 6.5, 'liability': 'Home Loan', 'source_account': 'Checking', 'extra_principal': 150.0},
+            {'name': 'Car', 'starting_balance': 24000.0, 'length': 5, 'rate': 4.0, 'liability': 'Car Loan', 'source_account': 'Savings'},
+        ],
+    )
+    saved_plan['interest_profiles'].append(constant_profile('Late Fees', 1.5))
+    return saved_plan
+
+@pytest.mark.parametrize('money_mode', MONEY_MODES)
+def test_amortized_matches_month_by_month(money_mode):
+    compiled_plan = CompiledPlan(Plan(mortgage_plan()))
+    assert len(compiled_plan.amortized_mortgages) == 2
+    results = compiled_plan.run(ENGINES[1], money_mode)
+    car_payments = results[1].loc[(results[1]['name'] == 'Car') & (results[1]['account'] == 'Car Loan')]
+    assert 0 < len(car_payments) < compiled_plan.month_quantity # paid off during the forecast
+    compiled_plan.amortized_mortgages = ()
+    for frame, expected_frame in zip(results, compiled_plan.run(ENGINES[1], money_mode)):
+        pdt.assert_frame_equal(frame, expected_frame, check_categorical=False)
+
+def test_shared_liability_is_not_amortized():
+    saved_plan = mortgage_plan()
+    saved_plan['mortgages'][1]['liability'] = 'Home Loan'
+    assert CompiledPlan(Plan(saved_plan)).amortized_mortgages == ()
+    saved_plan = mortgage_plan()
+    saved_plan['liabilities'][1]['enforce_minimum_balance'] = True
+    assert [mortgage.name for mortgage in CompiledPlan(Plan(saved_plan)).amortized_mortgages] == ['Home']
@@ -0,0 +1,35 @@
+""" Plan lookups by name must follow the items' current names """
+
+import pytest
+
+from Plan import Plan
+
+from plans import small_plan
+
+def test_lookup_after_rename_in_place():
+    plan = Plan(small_plan())
+    savings = plan.get_account('Savings')
+    savings.name = 'Renamed'
+    assert plan.get_account('Renamed') is savings
+    with pytest.raises(ValueError):
+        plan.get_account('Savings')
+    assert 'Renamed' in plan.get_name_index('accounts')
+
+def test_lookup_after_list_changes():
+    plan = Plan(small_plan())
+    checking = plan.get_account('Checking')
+    plan.accounts.remove(checking)
+    with pytest.raises(ValueError):
+        plan.get_account('Checking')
+    plan.accounts.append(checking)
+    assert plan.get_account('Checking') is checking
+
+def test_first_duplicate_wins():
+    plan = Plan(small_plan())
+    checking, savings = plan.accounts
+    plan.get_account('Checking')
+    savings.name = 'Checking'
+    assert plan.get_account('Checking') is checking
+    checking.name = 'Old Checking'
+    assert plan.get_account('Checking') is savings
+    assert plan.get_account('Old Checking') is checking
@@ -0,0 +1,90 @@
+""" Result logs and cached result frames """
+
+import datetime
+from decimal import Decimal
+
+import numpy as np
+import pandas.testing as pdt
+import pytest
+
+from benchmark import make_plan
+from Plan import Plan
+from CompiledPlan import CompiledPlan
+from Change import Change
+from Results import ChangeLog, Rollup, read_only_frame, cents_to_decimal, cents_to_decimals
+
+from plans import small_plan
+
+@pytest.fixture(scope='module')
+def results():
+    return CompiledPlan(Plan(make_plan(years=5))).run()
+
+def test_read_only_frames(results):
+    frames = [read_only_frame(frame) for frame in results]
+    rollup = Rollup(*frames).read_only()
+    expected_rollup = Rollup(*results)
+    for frame, expected_frame in zip(frames + [rollup.balances, rollup.transactions], list(results) + [expected_rollup.balances, expected_rollup.transactions]):
+        pdt.assert_frame_equal(frame, expected_frame)
+        for column in frame.columns:
+            # pandas raises ValueError, or for datetimes an AssertionError, from the read-only array
+            with pytest.raises((ValueError, AssertionError)):
+                frame.loc[frame.index[0], column] = frame[column].iloc[1]
+
+def test_shared_decimals_match_per_row():
+    cents = np.random.default_rng(0).integers(-50000, 50000, 2000) // 100 * 100
+    amounts = cents_to_decimals(cents)
+    assert list(amounts) == [cents_to_decimal(value) for value in cents]
+    assert [str(amount) for amount in amounts] == [str(cents_to_decimal(value)) for value in cents]
+    shared = {}
+    for value, amount in zip(cents, amounts):
+        assert shared.setdefault(value, amount) is amount
+
+def test_change_log_rows_match_changes():
+    statement_dates = [datetime.date(2025, month, 1) for month in range(1, 4)]
+    changes = [
+        [Change('income', 'Salary', Decimal('4000.00'), statement_dates[0], 'Checking'), Change('expense', 'Rent', Decimal('-1500.00'), statement_dates[0], 'Checking')],
+        [Change('income', 'Salary', Decimal('4000.00'), statement_dates[1], 'Checking'), Change('interest', 'Savings', Decimal('12.345'), statement_dates[1], 'Savings')],
+        [Change('expense', 'Rent', Decimal('-1500.00'), statement_dates[2], 'Checking'), Change('income', 'Salary', Decimal('0'), statement_dates[2], 'Checking')],
+    ]
+    change_log = ChangeLog(statement_dates)
+    for month_index, month_changes in enumerate(changes):
+        change_log.extend(month_index, month_changes)
+    flat = [change for month_changes in changes for change in month_changes]
+    assert [change.to_dict() for change in change_log] == [change.to_dict() for change in flat]
+    frame = change_log.to_frame()
+    assert frame['amount'].tolist() == [change.amount for change in flat]
+    assert frame['amount'][0] is frame['amount'][2] # one Decimal per distinct amount
+    assert frame['date'].tolist() == [change.date for change in flat]
+    for column in ['type', 'name', 'account']:
+        assert frame[column].astype(str).tolist() == [getattr(change, column) for change in flat]
+
+def test_change_has_no_instance_dict():
+    change = Change('income', 'Salary', Decimal('1.00'), datetime.date(2025, 1, 1), 'Checking')
+    assert not hasattr(change, '__dict__')
+    with pytest.raises(AttributeError):
+        change.note = 'extra'
+
+@pytest.mark.parametrize('column', ['inflow', 'outflow'])
+def test_rollup_flows_match_decimal_totals(column):
+    balance_log, transactions_df = CompiledPlan(Plan(small_plan())).run()
+    rollup = Rollup(balance_log, transactions_df)
+    sign = 1 if column == 'inflow' else -1
+    # Totals as the charts used to make them, summing Decimal amounts of one sign
+    moving = transactions_df.loc[[amount * sign > 0 for amount in transactions_df['amount']]]
+    expected = {}
+    for row in moving.itertuples():
+        key = (str(row.type), str(row.name), str(row.account), row.date)
+        expected[key] = expected.get(key, Decimal(0)) + row.amount * sign
+    flows = rollup.flows(column)
+    assert len(flows) == len(expected)
+    for row in flows.itertuples():
+        assert (row.year, row.month) == (row.date.year, row.date.month)
+        assert row.amount == pytest.approx(float(expected[(row.type, row.name, row.account, row.date.date())]), abs=1e-9)
+    assert flows['amount'].sum() == pytest.approx(float(sum(expected.values())))
+
+def test_rollup_balances_match_decimals():
+    balance_log, transactions_df = CompiledPlan(Plan(small_plan())).run()
+    balances = Rollup(balance_log, transactions_df).balances
+    assert balances['balance'].dtype == np.float64
+    assert balances['balance'].tolist() == [float(balance) for balance in balance_log['balance']]
+    assert balances['date'].dt.date.tolist() == balance_log['date'].tolist()
@@ -0,0 +1,48 @@
+""" Plan fingerprints and the results cache """
+
+from Plan import Plan
+from CompiledPlan import CheckpointStore, ENGINES
+from Money import MONEY_MODES
+from ResultsCache import ResultsCache, plan_fingerprint, dict_fingerprint
+from calculate import calculate
+
+from plans import small_plan
+
+def test_fingerprint_follows_plan_content():
+    plan = Plan(small_plan())
+    assert plan_fingerprint(plan) == plan_fingerprint(Plan(small_plan()))
+    plan.incomes[0].amount += 1
+    assert plan_fingerprint(plan) != plan_fingerprint(Plan(small_plan()))
+
+def test_linear_phases_saved():
+    plan = Plan(small_plan())
+    market = plan.to_dict()['interest_profiles'][2]
+    assert market['profile_phases'] == [{'phase_type': 'Linear', 'rate': 0.0, 'start_rate': 8.0, 'end_rate': 4.0}]
+    changed = small_plan()
+    changed['interest_profiles'][2]['profile_phases'][0]['end_rate'] = 5.0
+    assert plan_fingerprint(plan) != plan_fingerprint(Plan(changed))
+
+def test_least_recently_used_evicted():
+    cache = ResultsCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert (cache.hits, cache.misses) == (3, 1)
+    assert cache.get_or_build('d', lambda: 4) == 4
+    assert cache.get_or_build('d', lambda: 5) == 4
+
+def test_calculate_reuses_given_fingerprint(monkeypatch):
+    plan = Plan(small_plan())
+    fingerprint = plan_fingerprint(plan)
+    assert dict_fingerprint(plan.to_dict()) == fingerprint
+    expected = calculate(plan, cache=ResultsCache(), checkpoints=CheckpointStore())
+    monkeypatch.setattr(plan, 'to_dict', lambda: 1 / 0)
+    cache = ResultsCache()
+    results = calculate(plan, cache=cache, checkpoints=CheckpointStore(), fingerprint=fingerprint)
+    assert list(cache.entries) == [(fingerprint, ENGINES[0], MONEY_MODES[0])]
+    assert calculate(plan, cache=cache, fingerprint=fingerprint) is results
+    for frame, expected_frame in zip(results[:2], expected[:2]):
+        assert frame.equals(expected_frame)
@@ -0,0 +1,82 @@
+""" Batch runs keep every plan's outputs apart and survive a dying worker """
+
+import multiprocessing
+import os
+
+import pytest
+
+from benchmark import make_plan
+from Plan import Plan
+from YamlHandler import dump_yaml
+import run_batch
+
+def write_plan(path: str, seed: int):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    saved_plan = make_plan(accounts=2, incomes=2, expenses=3, transfers=1, years=5, seed=seed)
+    with open(path, 'w') as fh:
+        fh.write(dump_yaml(Plan(saved_plan).to_dict()))
+
+def test_output_prefixes_are_unique():
+    plan_paths = [
+        os.path.join('plans', 'client1', 'plan.yaml'),
+        os.path.join('plans', 'client2', 'plan.yaml'),
+        os.path.join('plans', 'client2', 'plan.yml'),
+        os.path.join('plans', 'other.yaml'),
+    ]
+    assert run_batch.output_prefixes(plan_paths) == [
+        'client1__plan',
+        '1__client2__plan',
+        '2__client2__plan',
+        'other',
+    ]
+
+def test_same_file_names_in_different_directories(tmp_path):
+    plan_paths = [str(tmp_path / 'plans' / client / 'plan.yaml') for client in ['client1', 'client2']]
+    for seed, plan_path in enumerate(plan_paths):
+        write_plan(plan_path, seed)
+    output_dir = tmp_path / 'results'
+    summary = run_batch.run_batch(plan_paths, str(output_dir), workers=2)
+    assert list(summary['status']) == ['ok', 'ok']
+    assert summary['final_total'].iloc[0] != summary['final_total'].iloc[1]
+    for prefix, final_total in zip(summary['prefix'], summary['final_total']):
+        balance_log = run_batch.pd.read_csv(output_dir / f'{prefix}_balance_log.csv')
+        assert balance_log.loc[balance_log['type'] == 'TOTAL', 'balance'].iloc[-1] == pytest.approx(final_total)
+
+def crashing_run_one(plan_path: str, *args) -> dict:
+    if os.path.basename(plan_path) == 'crash.yaml':
+        os._exit(1)
+    result = ORIGINAL_RUN_ONE(plan_path, *args)
+    result['pid'] = os.getpid()
+    return result
+
+ORIGINAL_RUN_ONE = run_batch.run_one
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason='workers must inherit the patched run_one')
+def test_dying_worker_only_fails_its_plan(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_batch, 'run_one', crashing_run_one)
+    plan_paths = [str(tmp_path / f'plan{i}.yaml') for i in range(4)]
+    plan_paths.insert(1, str(tmp_path / 'crash.yaml'))
+    for seed, plan_path in enumerate(plan_paths):
+        write_plan(plan_path, seed)
+    summary = run_batch.run_batch(plan_paths, str(tmp_path / 'results'), workers=2)
+    assert list(summary['status']) == ['ok', 'failed', 'ok', 'ok', 'ok']
+    assert 'BrokenProcessPool' in summary['error'].iloc[1]
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason='workers must inherit the patched run_one')
+def test_plans_lost_with_a_worker_rerun_in_pools(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_batch, 'run_one', crashing_run_one)
+    write_plan(str(tmp_path / 'shared.yaml'), 0)
+    with open(tmp_path / 'shared.yaml', 'r') as fh:
+        text = fh.read()
+    plan_paths = [str(tmp_path / f'plan{i}.yaml') for i in range(24)]
+    plan_paths.insert(1, str(tmp_path / 'crash.yaml'))
+    for plan_path in plan_paths:
+        with open(plan_path, 'w') as fh:
+            fh.write(text)
+    monkeypatch.setattr(run_batch, 'SUMMARY_COLUMNS', run_batch.SUMMARY_COLUMNS + ['pid'])
+    summary = run_batch.run_batch(plan_paths, str(tmp_path / 'results'), workers=2)
+    finished = summary.loc[summary['status'] == 'ok']
+    assert list(summary.loc[summary['status'] != 'ok', 'plan']) == [plan_paths[1]]
+    assert len(finished) == 24
+    # Queued plans are rerun a pool at a time, not one process per plan
+    assert finished['pid'].nunique() <= len(finished) // 2
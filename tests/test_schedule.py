@@ -0,0 +1,55 @@
+""" Precomputed firing months must match checking every transaction every month """
+
+import datetime
+import itertools
+
+from common import date_id
+from Plan import Plan
+from CompiledPlan import CompiledPlan
+from Transaction import Transfer, FREQUENCIES, DURATION_OPTIONS
+
+from plans import small_plan, START_YEAR
+
+def stepped_firing_months(item, statement_dates: tuple) -> list:
+    """ The months the per month ``update`` check used to fire in """
+    months = []
+    month_count = 0
+    for period_index, statement_date in enumerate(statement_dates):
+        statement_id = date_id(statement_date)
+        if item.start is not None and statement_id < date_id(item.start):
+            continue
+        if item.end is not None and statement_id > date_id(item.end):
+            continue
+        if not isinstance(item, Transfer): # Transfers ignored month_gap
+            month_count += 1
+            if item.month_gap is not None:
+                if month_count < item.month_gap:
+                    continue
+                month_count = 0
+        months.append(period_index)
+    return months
+
+def test_firing_months_match_stepping():
+    start = datetime.date(START_YEAR + 1, 3, 1)
+    end = datetime.date(START_YEAR + 3, 8, 1)
+    dates = {
+        DURATION_OPTIONS[0]: {},
+        DURATION_OPTIONS[1]: {'start': start, 'end': end},
+        DURATION_OPTIONS[2]: {'end': end},
+        DURATION_OPTIONS[3]: {'start': start},
+        DURATION_OPTIONS[4]: {'start': start},
+    }
+    items = []
+    for frequency, duration, month_gap in itertools.product(FREQUENCIES, DURATION_OPTIONS, [2, 5]):
+        item = {'name': f'{frequency} {duration} {month_gap}', 'amount': 10.0, 'frequency': frequency, 'duration': duration, **dates[duration]}
+        if frequency == FREQUENCIES[4]: # Every X Months
+            item['month_gap'] = month_gap
+        items.append(item)
+    expenses = [dict(item, source_account='Checking') for item in items]
+    transfers = [dict(item, source_account='Checking', destination_account='Savings') for item in items]
+    compiled_plan = CompiledPlan(Plan(small_plan(incomes=[], expenses=expenses, transfers=transfers)))
+    for item in compiled_plan.transaction_items:
+        assert list(item.firing_months(compiled_plan.statement_ids)) == stepped_firing_months(item, compiled_plan.statement_dates), item.name
+    for period_index, items_firing in enumerate(compiled_plan.schedule):
+        assert all(period_index in item.firing_months(compiled_plan.statement_ids) for item in items_firing)
+    assert sum(len(items_firing) for items_firing in compiled_plan.schedule) == sum(len(item.firing_months(compiled_plan.statement_ids)) for item in compiled_plan.transaction_items)
@@ -0,0 +1,38 @@
+""" Sweeps must give the final net worth of each rendered variant """
+
+import pytest
+
+from YamlHandler import dump_yaml, load_yaml
+from Plan import Plan
+from CompiledPlan import CompiledPlan
+from run_forecast import final_total
+from sweep import sweep, constant_range, FINAL_NET_WORTH
+
+from plans import small_plan
+
+def plan_template() -> str:
+    text = dump_yaml(Plan(small_plan()).to_dict())
+    assert text.count('amount: 4000.0') == 1 and text.count('rate: 2.5') == 1
+    text = text.replace('amount: 4000.0', 'amount: {{ salary }}').replace('rate: 2.5', 'rate: {{ inflation }}')
+    return 'salary: 4000.0\ninflation: 2.5\n---\n' + text
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_sweep_matches_each_variant(workers):
+    content = plan_template()
+    grid = {'salary': [3000.0, 4000.0], 'inflation': constant_range(1.0, 3.0, 3)}
+    table = sweep(content, grid, workers=workers)
+    assert len(table) == 6
+    for row in table.itertuples(index=False):
+        saved_plan = load_yaml(content, {'salary': row.salary, 'inflation': row.inflation}, cache=None)
+        balance_log, _ = CompiledPlan(Plan(saved_plan)).run()
+        assert getattr(row, FINAL_NET_WORTH) == final_total(balance_log)
+
+def test_constants_outside_the_grid_keep_their_value():
+    content = plan_template()
+    table = sweep(content, {'salary': [4000.0]}, workers=1)
+    balance_log, _ = CompiledPlan(Plan(load_yaml(content, cache=None))).run()
+    assert table[FINAL_NET_WORTH].iloc[0] == final_total(balance_log)
+
+def test_unknown_constant():
+    with pytest.raises(ValueError):
+        sweep(plan_template(), {'bonus': [1.0]}, workers=1)
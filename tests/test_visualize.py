@@ -0,0 +1,69 @@
+""" Downsampled chart series must match plain Largest-Triangle-Three-Buckets """
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from visualize import lttb_indices, downsample
+
+def reference_lttb(x: list, y: list, points: int) -> list:
+    """ Largest-Triangle-Three-Buckets written out one sample at a time """
+    quantity = len(y)
+    if points >= quantity or points < 3:
+        return list(range(quantity))
+    every = (quantity - 2) / (points - 2)
+    selected = [0]
+    a = 0
+    for i in range(points - 2):
+        average_start = int((i + 1) * every) + 1
+        average_end = min(int((i + 2) * every) + 1, quantity)
+        average_x = sum(x[average_start:average_end]) / (average_end - average_start)
+        average_y = sum(y[average_start:average_end]) / (average_end - average_start)
+        largest_area = -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((x[a] - average_x) * (y[j] - y[a]) - (x[a] - x[j]) * (average_y - y[a]))
+            if area > largest_area:
+                largest_area = area
+                chosen = j
+        selected.append(chosen)
+        a = chosen
+    selected.append(quantity - 1)
+    return selected
+
+@pytest.mark.parametrize('quantity,points', [(10, 3), (100, 7), (600, 300), (1000, 299), (5000, 300), (50, 50), (50, 2)])
+def test_lttb_matches_reference(quantity, points):
+    generator = np.random.default_rng(quantity + points)
+    x = np.cumsum(generator.integers(28, 32, quantity)).astype(np.float64)
+    y = np.cumsum(generator.normal(0.0, 1000.0, quantity))
+    assert lttb_indices(x, y, points).tolist() == reference_lttb(x.tolist(), y.tolist(), points)
+
+def balance_frame(months: int) -> pd.DataFrame:
+    generator = np.random.default_rng(0)
+    dates = pd.date_range('2025-01-01', periods=months, freq='MS')
+    frames = []
+    for account, scale in [('Checking', 100.0), ('Savings', 2000.0)]:
+        frames.append(pd.DataFrame({'date': dates, 'account': account, 'balance': np.cumsum(generator.normal(10.0, scale, months))}))
+    frames.append(pd.DataFrame({'date': dates[:20], 'account': 'Car Loan', 'balance': np.linspace(-20000.0, 0.0, 20)}))
+    return pd.concat(frames).sort_values('date', kind='stable').reset_index(drop=True)
+
+def test_downsample_keeps_shape_and_extremes():
+    frame = balance_frame(1200)
+    points = 100
+    sampled = downsample(frame, 'date', 'balance', 'account', points)
+    assert sampled.index.is_monotonic_increasing
+    for account, series in frame.groupby('account'):
+        kept = sampled.loc[sampled['account'] == account]
+        if len(series) <= points:
+            pd.testing.assert_frame_equal(kept, series)
+            continue
+        assert points <= len(kept) <= points + 2
+        for position in [series.index[0], series.index[-1], series['balance'].idxmin(), series['balance'].idxmax()]:
+            assert position in kept.index
+        x = (series['date'] - series['date'].iloc[0]).dt.days.to_numpy(dtype=np.float64)
+        lttb = series.index[lttb_indices(x, series['balance'].to_numpy(), points)]
+        assert set(lttb) <= set(kept.index)
+
+def test_downsample_zero_keeps_everything():
+    frame = balance_frame(50)
+    assert downsample(frame, 'date', 'balance', 'account', 0) is frame
+    pd.testing.assert_frame_equal(downsample(frame, 'date', 'balance', 'account', 300), frame)
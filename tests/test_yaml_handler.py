@@ -0,0 +1,49 @@
+""" Memoized plan file parsing and dumping must match doing the work every time """
+
+from Plan import Plan
+from ResultsCache import ResultsCache, plan_fingerprint
+from YamlHandler import load_yaml, dump_plan, dump_yaml, safe_dump, PARSED_PLANS, DUMPED_PLANS
+
+from plans import small_plan
+
+def plan_file(constants: str = 'salary: 4000.0') -> str:
+    content = dump_yaml(Plan(small_plan()).to_dict()).replace('amount: 4000.0', 'amount: {{ salary }}')
+    return f'{constants}\n---\n{content}'
+
+def test_memoized_load_returns_copies():
+    cache = ResultsCache(label='Test plans')
+    content = plan_file()
+    expected = load_yaml(content, cache=None)
+    first = load_yaml(content, cache=cache)
+    second = load_yaml(content, cache=cache)
+    assert first == expected and second == expected
+    assert first is not second
+    first['incomes'][0]['amount'] = 1.0
+    assert load_yaml(content, cache=cache) == expected
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_memoized_load_keys_on_constants():
+    cache = ResultsCache()
+    content = plan_file()
+    for constants in [None, {'salary': 5000.0}, {'salary': 6000.0}]:
+        expected = load_yaml(content, constants, cache=None)
+        assert load_yaml(content, constants, cache=cache) == expected
+        assert load_yaml(content, constants, cache=cache) == expected
+    assert load_yaml(content, {'salary': 5000.0}, cache=cache)['incomes'][0]['amount'] == 5000.0
+    assert (cache.hits, cache.misses) == (4, 3)
+
+def test_memoized_dump_follows_content():
+    cache = ResultsCache()
+    plan = Plan(small_plan())
+    assert dump_plan(plan.to_dict(), cache=cache) == safe_dump(plan.to_dict())
+    assert dump_plan(plan.to_dict(), cache=cache) == safe_dump(plan.to_dict())
+    plan.expenses[0].name = 'Lease'
+    assert dump_plan(plan.to_dict(), cache=cache) == safe_dump(plan.to_dict())
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert dump_plan(plan.to_dict(), cache=cache, fingerprint=plan_fingerprint(plan)) == safe_dump(plan.to_dict())
+    assert (cache.hits, cache.misses) == (2, 2)
+
+def test_cache_labels():
+    assert PARSED_PLANS.summary.startswith('Parsed plan cache: ')
+    assert DUMPED_PLANS.summary.startswith('Dumped plan cache: ')
+    assert ResultsCache().summary.startswith('Forecast cache: ')
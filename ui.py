@@ -0,0 +1,35 @@
+""" Streamlit access for the model modules
+
+The model modules only need Streamlit for their ``configure`` widgets, so
+``st`` here imports it on first use.  Messages raised while building or
+forecasting a plan go through ``error``/``warning``, which use Streamlit when
+the app has loaded it and ``logging`` otherwise (e.g. the command line runner).
+"""
+
+import logging
+import sys
+
+logger = logging.getLogger('discrete_financial_forecast')
+
+class LazyStreamlit:
+
+    def __getattr__(self, name: str):
+        import streamlit
+        return getattr(streamlit, name)
+
+st = LazyStreamlit()
+
+def streamlit_loaded() -> bool:
+    return 'streamlit' in sys.modules
+
+def error(message: str):
+    if streamlit_loaded():
+        st.error(message)
+    else:
+        logger.error(message)
+
+def warning(message: str):
+    if streamlit_loaded():
+        st.warning(message)
+    else:
+        logger.warning(message)
@@ -0,0 +1,161 @@
+""" Vectorized forecast engine
+
+Computes the same ``balance_log`` and ``transactions_df`` as the object engine
+in ``calculate`` using (items x months) NumPy matrices in integer cents.  Only
+plans without path-dependent features (minimum balance enforcement, active
+mortgages) are supported, see ``supports_vectorized``.
+"""
+
+import numpy as np
+
+from common import (
+    year_month_id,
+    id_to_date,
+    date_id,
+    f2c,
+    ZERO,
+    HALF_CENT_TOLERANCE,
+    EXACT_CENTS_LIMIT,
+)
+from Transaction import Transfer
+from Results import BalanceLog, ChangeLog, CHUNK_ROWS
+
+def supports_vectorized(plan) -> bool:
+    for mortgage in plan.mortgages:
+        if mortgage.starting_balance > ZERO:
+            return False
+    for asset_list in [plan.accounts, plan.assets, plan.liabilities]:
+        for asset_item in asset_list:
+            if asset_item.enforce_minimum_balance:
+                return False
+            if asset_item.starting_balance != round(asset_item.starting_balance, 2):
+                return False
+    return True
+
+def round_cents(values: np.ndarray) -> np.ndarray:
+    """ Array version of ``common.f2c`` """
+    scaled = values * 100.0
+    cents = np.rint(scaled)
+    ambiguous = (np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < HALF_CENT_TOLERANCE) | (np.abs(scaled) >= EXACT_CENTS_LIMIT)
+    result = cents.astype(np.int64)
+    for index in zip(*np.nonzero(ambiguous)):
+        result[index] = f2c(float(values[index]))
+    return result
+
+def transaction_schedule(plan, transaction_items: list, statement_ids: np.ndarray, asset_indices: dict) -> tuple:
+    """ When each transaction fires and which balances it changes
+
+    Returns ``fires`` (items x months, bool) and, for every leg (one balance
+    change, two for a Transfer), its item row, balance row and sign.
+    """
+    fires = np.zeros((len(transaction_items), len(statement_ids)), dtype=bool)
+    leg_items = []
+    leg_accounts = []
+    leg_signs = []
+    statement_id_list = tuple(int(statement_id) for statement_id in statement_ids)
+    for i, item in enumerate(transaction_items):
+        fires[i, item.firing_months(statement_id_list)] = True
+        if isinstance(item, Transfer):
+            legs = [(item.source_account, -1), (item.destination_account, 1)]
+        else:
+            legs = [(item.active_account, 1)]
+        for account_name, sign in legs:
+            leg_items.append(i)
+            leg_accounts.append(asset_indices[id(plan.get_account(account_name))])
+            leg_signs.append(sign)
+    return (
+        fires,
+        np.array(leg_items, dtype=np.int64),
+        np.array(leg_accounts, dtype=np.int64),
+        np.array(leg_signs, dtype=np.int64),
+    )
+
+def vectorized_logs(plan, sink = None, chunk_rows: int = CHUNK_ROWS) -> tuple:
+    """ Forecast the plan into a (``BalanceLog``, ``ChangeLog``) pair
+
+    :param sink: optional ``ChangeSinks.ChangeSink``, the transaction log is
+        flushed to it in blocks of months of at most ``chunk_rows`` rows
+        (one month at a time if a month has more), leaving the ``ChangeLog``
+        empty.  The (items x months) numeric matrices still grow with the
+        horizon, about 8 bytes per item and month.
+    """
+    start_date_id = year_month_id(plan.configuration.start_year, plan.configuration.start_month)
+    end_date_id = year_month_id(plan.configuration.end_year, plan.configuration.end_month)
+    month_quantity = end_date_id - start_date_id
+    statement_dates = [id_to_date(current_date_id + 1) for current_date_id in range(start_date_id, end_date_id)]
+    statement_ids = np.array([date_id(statement_date) for statement_date in statement_dates], dtype=np.int64)
+
+    # Balance bearing items in balance_log order
+    asset_items = plan.accounts + plan.assets + plan.liabilities
+    asset_indices = {id(asset_item): i for i, asset_item in enumerate(asset_items)}
+    starting_cents = np.array([int(asset_item.starting_balance.scaleb(2)) for asset_item in asset_items], dtype=np.int64)
+    rates = np.zeros((len(asset_items), month_quantity))
+    for i, asset_item in enumerate(asset_items):
+        profile = plan.get_interest_profile(asset_item.interest_profile)
+        rates[i, :] = np.frombuffer(profile.rates, dtype=np.float64)[:month_quantity]
+
+    # Transaction schedule and amounts, one row per item
+    transaction_items = plan.incomes + plan.expenses + plan.transfers
+    fires, leg_items, leg_accounts, leg_signs = transaction_schedule(plan, transaction_items, statement_ids, asset_indices)
+    amounts = np.zeros((len(transaction_items), month_quantity), dtype=np.int64)
+    for i, item in enumerate(transaction_items):
+        profile = plan.get_interest_profile(item.interest_profile)
+        factors = np.frombuffer(profile.get_future_value_factors(), dtype=np.float64)[:month_quantity]
+        amounts[i, :] = np.where(fires[i, :], round_cents(float(item.monthly_amount) * factors), 0)
+    leg_cents = amounts[leg_items, :] * leg_signs[:, None]
+    flows = np.zeros((len(asset_items), month_quantity), dtype=np.int64)
+    np.add.at(flows, leg_accounts, leg_cents)
+
+    # Interest is assessed on the previous balance, so step through the months
+    interest = np.zeros((len(asset_items), month_quantity), dtype=np.int64)
+    balances = np.zeros((len(asset_items), month_quantity), dtype=np.int64)
+    balance = starting_cents
+    for month in range(month_quantity):
+        month_interest = round_cents(rates[:, month] * (balance / 100.0))
+        month_interest[month_interest < 0] = 0
+        interest[:, month] = month_interest
+        balance = balance + month_interest + flows[:, month]
+        balances[:, month] = balance
+
+    balance_log = BalanceLog(asset_items, statement_dates)
+    balance_log.record_cents(balances.T)
+
+    # transactions_df: interest (in item order) then transaction legs each
+    # month, built a block of months at a time so a sink gets bounded chunks
+    change_log = ChangeLog(statement_dates)
+    interest_type = change_log.types.code('interest')
+    interest_names = np.array([change_log.names.code(asset_item.name + '_interest') for asset_item in asset_items], dtype=np.int32)
+    asset_accounts = np.array([change_log.accounts.code(asset_item.name) for asset_item in asset_items], dtype=np.int32)
+    leg_types = np.array([change_log.types.code(transaction_items[i].transaction_type) for i in leg_items], dtype=np.int32)
+    leg_names = np.array([change_log.names.code(transaction_items[i].name) for i in leg_items], dtype=np.int32)
+    leg_fires = fires[leg_items, :]
+    if sink is None:
+        block_months = max(month_quantity, 1)
+    else:
+        block_months = max(chunk_rows // max(len(asset_items) + len(leg_items), 1), 1)
+    for first_month in range(0, month_quantity, block_months):
+        months = slice(first_month, first_month + block_months)
+        interest_items, interest_months = np.nonzero(interest[:, months] > 0)
+        leg_positions, leg_months = np.nonzero(leg_fires[:, months])
+        interest_months += first_month
+        leg_months += first_month
+        order = np.lexsort((
+            np.concatenate([interest_items, leg_positions]),
+            np.concatenate([np.zeros(len(interest_months), dtype=np.int64), np.ones(len(leg_months), dtype=np.int64)]),
+            np.concatenate([interest_months, leg_months]),
+        ))
+        change_log.extend_arrays(
+            np.concatenate([interest_months, leg_months])[order],
+            np.concatenate([np.full(len(interest_items), interest_type, dtype=np.int32), leg_types[leg_positions]])[order],
+            np.concatenate([interest_names[interest_items], leg_names[leg_positions]])[order],
+            np.concatenate([asset_accounts[interest_items], asset_accounts[leg_accounts[leg_positions]]])[order],
+            np.concatenate([interest[interest_items, interest_months], leg_cents[leg_positions, leg_months]])[order],
+        )
+        if sink is not None:
+            change_log.flush(sink)
+    return balance_log, change_log
+
+def calculate_vectorized(plan) -> tuple:
+    """ Forecast the plan, returns (balance_log, transactions_df) """
+    balance_log, change_log = vectorized_logs(plan)
+    return balance_log.to_frame(), change_log.to_frame()
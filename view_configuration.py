@@ -3,11 +3,10 @@
 import datetime
 
 import streamlit as st
-import yaml
-from jinja2 import Template
 
 from Plan import Plan
-from YamlHandler import split_constants, load_yaml
+from YamlHandler import split_constants, load_yaml, safe_load, dump_plan
+from ResultsCache import plan_fingerprint, dict_fingerprint
 from query_to_plan import query_to_plan
 
 def configure_constants(constants: dict) -> dict:
@@ -27,7 +26,8 @@ def configure_constants(constants: dict) -> dict:
         new_constants[key] = new_value
     return new_constants
 
-def view_configuration() -> Plan:
+def view_configuration() -> tuple:
+    """ Plan from the selected editor mode, returns (plan, ``plan_fingerprint(plan)``) """
     st.sidebar.markdown('# Editor Configuration')
     EDITOR_MODES = ['GUI Configuration', 'Manual Configuration', 'View Only', 'Plan Comparison', 'Documentation']
     editor_mode = st.sidebar.radio(' Editor Mode', options=EDITOR_MODES)
@@ -55,7 +55,9 @@ def view_configuration() -> Plan:
 
         plan = Plan(dict_plan, check_version=False)
         plan.configure()
-        plan_download_data = yaml.safe_dump(plan.to_dict())
+        plan_dict = plan.to_dict()
+        fingerprint = dict_fingerprint(plan_dict)
+        plan_download_data = dump_plan(plan_dict, fingerprint=fingerprint)
     elif editor_mode in [EDITOR_MODES[1], EDITOR_MODES[2]]: # Config or None
         if upload_content is None:
             st.error(f' `{editor_mode}` Mode requires a previous plan to be uploaded.')
@@ -65,15 +67,15 @@ def view_configuration() -> Plan:
             plan_content = st.text_area('Configuration File', value=upload_content, height=1000)
         else:
             plan_content = upload_content
-        constants_str, data = split_constants(plan_content)
+        constants_str, _ = split_constants(plan_content)
         if constants_str is not None:
-            constants = yaml.safe_load(constants_str)
+            constants = safe_load(constants_str)
             if st.checkbox('Adjust Configuration File Constants?'):
                 constants = configure_constants(constants)
         else:
             constants = {}
-        data = Template(data).render(constants)
-        plan = Plan(yaml.safe_load(data))
+        plan = Plan(load_yaml(plan_content, constants))
+        fingerprint = plan_fingerprint(plan)
         plan_download_data = plan_content
     elif editor_mode == EDITOR_MODES[3]: # Plan Comparison
         st.markdown(""" ## Plan Comparison Coming Soon!
@@ -99,4 +101,4 @@ This page will provide the ability to compare multiple forecast config files""")
         data= plan_download_data,
         file_name=f'{datetime.datetime.today().date()}_plan.yaml',
     )
-    return plan
\ No newline at end of file
+    return plan, fingerprint
\ No newline at end of file
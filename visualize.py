@@ -1,44 +1,100 @@
 """ Visualization """
 
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+DEFAULT_SERIES_POINTS = 300
+WEBGL_POINTS = 5000 # Charts with more points than this are drawn with WebGL
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """ Positions of ``points`` samples chosen by Largest-Triangle-Three-Buckets
+
+    The first and last samples are always kept, in between each bucket keeps
+    the sample making the largest triangle with the previously kept sample
+    and the average of the next bucket, which preserves the visual shape.
+    """
+    quantity = len(y)
+    if points >= quantity or points < 3:
+        return np.arange(quantity)
+    bucket_size = (quantity - 2) / (points - 2)
+    # Bucket i covers bounds[i]:bounds[i + 1], the last one is just the final sample
+    bounds = (np.arange(points - 1) * bucket_size).astype(np.int64) + 1
+    counts = np.diff(np.append(bounds, quantity))
+    average_x = np.add.reduceat(x, bounds) / counts
+    average_y = np.add.reduceat(y, bounds) / counts
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(points - 2):
+        start = bounds[i]
+        end = bounds[i + 1]
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs((x[a] - average_x[i + 1]) * (bucket_y - y[a]) - (x[a] - bucket_x) * (average_y[i + 1] - y[a]))
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+    selected[-1] = quantity - 1
+    return selected
+
+def downsample(frame: pd.DataFrame, x: str, y: str, series: str, points: int = DEFAULT_SERIES_POINTS) -> pd.DataFrame:
+    """ About ``points`` rows of each ``series`` (rows in ``x`` order), 0 keeps every row
+
+    Each series keeps its LTTB samples plus its minimum and maximum ``y``.
+    """
+    if points < 1 or len(frame) < 1:
+        return frame
+    x_values = pd.to_numeric(frame[x]).to_numpy(dtype=np.float64)
+    y_values = frame[y].to_numpy(dtype=np.float64)
+    keep = []
+    for positions in frame.groupby(series, observed=True, sort=False).indices.values():
+        if len(positions) <= points:
+            keep.append(positions)
+            continue
+        series_x = x_values[positions] - x_values[positions[0]]
+        series_y = y_values[positions]
+        selected = lttb_indices(series_x, series_y, points)
+        keep.append(positions[np.union1d(selected, [np.argmin(series_y), np.argmax(series_y)])])
+    return frame.iloc[np.sort(np.concatenate(keep))]
+
+def render_mode(point_quantity: int) -> str:
+    """ ``render_mode`` for ``px.line`` """
+    return 'webgl' if point_quantity > WEBGL_POINTS else 'auto'
+
 def visualize_transactions(transactions: pd.DataFrame, plan, label: str):
+    """ Charts of one ``Results.Rollup.flows`` slice, ``amount`` is positive float dollars per month """
     if len(transactions) > 0:
         expense_types = transactions['type'].unique()
         displayed_types = st.multiselect(f'{label} Types to Display', options=expense_types, default=expense_types)
         displayed_transactions = transactions.loc[transactions['type'].isin(displayed_types)]
-        displayed_transactions['abs_amount'] = displayed_transactions['amount'].abs()
-        
+
         if st.checkbox(f'{label} Time View'):
             options = [year for year in range(plan.configuration.start.year, plan.configuration.end.year + 1)]
             selected_year = st.selectbox(f'{label} Year', index=0, options=options)
-            displayed_transactions['year'] = displayed_transactions['date'].dt.year
-            displayed_transactions['float_amount'] = displayed_transactions['abs_amount'].astype(float)
             st.plotly_chart(px.bar(
                 displayed_transactions.loc[displayed_transactions['year'] == selected_year, :],
                 x='date',
-                y='abs_amount',
+                y='amount',
                 color='name',
                 title=f'{label}(s) for Year {selected_year}',
                 labels={
                     'date': f'{label} Statement Date',
-                    'abs_amount': f'Total Monthly {label} Amount',
+                    'amount': f'Total Monthly {label} Amount',
                     'name': f'{label} Name',
                 }
             ), use_container_width=True)
 
         if st.checkbox(f'Total {label}(s)'):
             st.plotly_chart(px.bar(
-                displayed_transactions.groupby('name').sum().reset_index(drop=False),
+                displayed_transactions.groupby('name', observed=True)[['amount']].sum().reset_index(drop=False),
                 x='name',
-                y='float_amount',
+                y='amount',
                 color='name',
                 title=f'Total {label} by Source',
                 labels={
                     'name': f'{label} Name',
-                    'float_amount': f'Total {label} Amount ($)',
+                    'amount': f'Total {label} Amount ($)',
                 }
             ), use_container_width=True)
     else: